@@ -0,0 +1,103 @@
+"""Сериализаторы JSON API.
+
+Каждое поле знает, какие поля модели ему нужны, поэтому при выборке
+только части полей (`?fields=`) queryset загружает из базы только их.
+"""
+
+
+class Field:
+    def __init__(self, getter, only=(), related=()):
+        self.getter = getter
+        self.only = only
+        self.related = related
+
+
+def _url(file):
+    return file.url if file else None
+
+
+class Serializer:
+    fields = {}
+
+    def __init__(self, names=None):
+        if names:
+            unknown = set(names) - set(self.fields)
+            if unknown:
+                raise ValueError(
+                    'Неизвестные поля: ' + ', '.join(sorted(unknown))
+                )
+        self.names = list(names or self.fields)
+
+    def prepare(self, queryset, *required):
+        """queryset, загружающий только нужные выбранным полям данные."""
+        only, related = list(required), []
+        for name in self.names:
+            only.extend(self.fields[name].only)
+            related.extend(self.fields[name].related)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*only)
+
+    def serialize(self, obj):
+        return {name: self.fields[name].getter(obj) for name in self.names}
+
+    def serialize_many(self, objects):
+        return [self.serialize(obj) for obj in objects]
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': Field(lambda post: post.pk),
+        'text': Field(lambda post: post.text, ('text',)),
+        'pub_date': Field(lambda post: post.pub_date, ('pub_date',)),
+        'author': Field(
+            lambda post: post.author.username,
+            ('author', 'author__username'), ('author',),
+        ),
+        'group': Field(
+            lambda post: post.group.slug if post.group_id else None,
+            ('group', 'group__slug'), ('group',),
+        ),
+        'image': Field(lambda post: _url(post.image), ('image',)),
+        'comments_count': Field(
+            lambda post: post.comments_count, ('comments_count',)
+        ),
+    }
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': Field(lambda comment: comment.pk),
+        'post': Field(lambda comment: comment.post_id, ('post',)),
+        'parent': Field(lambda comment: comment.parent_id, ('parent',)),
+        'depth': Field(lambda comment: comment.depth, ('depth',)),
+        'replies_count': Field(
+            lambda comment: comment.replies_count, ('replies_count',)
+        ),
+        'author': Field(
+            lambda comment: comment.author.username,
+            ('author', 'author__username'), ('author',),
+        ),
+        'text': Field(lambda comment: comment.text, ('text',)),
+        'created': Field(lambda comment: comment.created, ('created',)),
+    }
+
+
+def _stat(name):
+    def getter(user):
+        stats = getattr(user, 'stats', None)
+        return getattr(stats, name, 0)
+    return Field(getter, (f'stats__{name}',), ('stats',))
+
+
+class ProfileSerializer(Serializer):
+    fields = {
+        'username': Field(lambda user: user.username, ('username',)),
+        'first_name': Field(lambda user: user.first_name, ('first_name',)),
+        'last_name': Field(lambda user: user.last_name, ('last_name',)),
+        'posts_count': _stat('posts_count'),
+        'followers_count': _stat('followers_count'),
+        'following_count': _stat('following_count'),
+        # Выставляется view: подписан ли на автора текущий пользователь.
+        'is_followed': Field(lambda user: getattr(user, 'is_followed', False)),
+    }
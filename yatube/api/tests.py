@@ -0,0 +1,95 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(3)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.json()
+
+    def test_feeds_are_paginated_by_cursor(self):
+        url = reverse('api:group_posts', args=[self.group.slug])
+        first = self.get(url, limit=2)
+        self.assertEqual(
+            [post['id'] for post in first['results']],
+            [self.posts[2].pk, self.posts[1].pk],
+        )
+        self.assertEqual(first['results'][0]['group'], self.group.slug)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            [post['id'] for post in second['results']], [self.posts[0].pk]
+        )
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+
+    def test_sparse_fieldsets(self):
+        data = self.get(reverse('api:posts'), fields='id,author')
+        self.assertEqual(
+            data['results'][0], {'id': self.posts[2].pk, 'author': 'author'}
+        )
+        response = self.client.get(reverse('api:posts'), {'fields': 'x'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_etag(self):
+        response = self.client.get(reverse('api:posts'))
+        self.assertTrue(response.has_header('ETag'))
+        cached = self.client.get(
+            reverse('api:posts'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('api:follow_posts')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        self.client.force_login(self.reader)
+        self.assertEqual(len(self.get(url)['results']), 3)
+
+    def test_post_comments_and_profile(self):
+        post = self.posts[0]
+        self.assertEqual(
+            self.get(reverse('api:post', args=[post.pk]))['comments_count'], 1
+        )
+        comments = self.get(reverse('api:comments', args=[post.pk]))
+        self.assertEqual(comments['results'][0]['text'], 'Комментарий')
+        profile = self.get(reverse('api:profile', args=['author']))
+        self.assertEqual(profile['posts_count'], 3)
+        self.assertEqual(profile['followers_count'], 1)
+        response = self.client.get(reverse('api:post', args=[0]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertIn('detail', response.json())
+
+    def test_feed_queries(self):
+        with self.assertNumQueries(1):
+            self.get(reverse('api:posts'))
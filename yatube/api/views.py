@@ -0,0 +1,162 @@
+"""JSON API только для чтения.
+
+Списки листаются курсорами `core.paginator` (`?cursor=`, размер страницы
+`?limit=`), набор полей выбирается параметром `?fields=a,b`. Ответы
+снабжены ETag и на совпадающий If-None-Match отвечают 304.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import urlencode
+from django.views.decorators.http import require_safe
+
+from core.paginator import DEFAULT_ORDERING, CursorPaginator
+from posts.follow_cache import following
+from posts.models import Comment, Group, Post
+from posts.timeline import timeline_posts
+from yatube.settings import page_limit
+
+from .serializers import CommentSerializer, PostSerializer, ProfileSerializer
+
+User = get_user_model()
+
+COMMENT_ORDERING = ('-created', '-pk')
+JSON_OPTIONS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def error_response(status, detail):
+    return JsonResponse(
+        {'detail': detail}, status=status, json_dumps_params=JSON_OPTIONS
+    )
+
+
+def api_view(view):
+    """Оборачивает view, возвращающую данные, в JSON-ответ с ETag."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except Http404:
+            return error_response(404, 'Не найдено.')
+        except ApiError as error:
+            return error_response(error.status, error.detail)
+        response = JsonResponse(
+            data, encoder=DjangoJSONEncoder, json_dumps_params=JSON_OPTIONS
+        )
+        etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+        response['ETag'] = etag
+        return get_conditional_response(
+            request, etag=etag, response=response
+        ) or response
+    return wrapper
+
+
+def serializer_for(request, serializer_class):
+    fields = request.GET.get('fields')
+    names = [name for name in fields.split(',') if name] if fields else None
+    try:
+        return serializer_class(names)
+    except ValueError as error:
+        raise ApiError(400, str(error))
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', page_limit))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом.')
+    return min(max(limit, 1), settings.API_MAX_LIMIT)
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params.pop('page', None)
+    params['cursor'] = cursor
+    return f'{request.path}?{urlencode(sorted(params.items()))}'
+
+
+def page(request, queryset, serializer_class, ordering=None):
+    """Страница списка с курсорами соседних страниц."""
+    serializer = serializer_for(request, serializer_class)
+    ordering = ordering or queryset.query.order_by or DEFAULT_ORDERING
+    # Поля курсора должны быть загружены вместе с выбранными.
+    required = [
+        field.lstrip('-') for field in ordering
+        if field.lstrip('-') not in queryset.query.annotations
+    ]
+    queryset = serializer.prepare(queryset, *required)
+    paginator = CursorPaginator(queryset, page_size(request), ordering)
+    page_obj = paginator.get_page(cursor=request.GET.get('cursor'))
+    return {
+        'results': serializer.serialize_many(page_obj),
+        'next': _link(request, page_obj.next_cursor),
+        'previous': _link(request, page_obj.previous_cursor),
+    }
+
+
+@api_view
+def posts(request):
+    return page(request, Post.objects.all(), PostSerializer)
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return page(request, Post.objects.filter(group=group), PostSerializer)
+
+
+@api_view
+def profile(request, username):
+    serializer = serializer_for(request, ProfileSerializer)
+    author = get_object_or_404(
+        serializer.prepare(User.objects.all()), username=username
+    )
+    author.is_followed = author.pk in following(request.user)
+    return serializer.serialize(author)
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return page(request, Post.objects.filter(author=author), PostSerializer)
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Требуется авторизация.')
+    return page(request, timeline_posts(request.user), PostSerializer)
+
+
+@api_view
+def post(request, post_id):
+    serializer = serializer_for(request, PostSerializer)
+    return serializer.serialize(
+        get_object_or_404(serializer.prepare(Post.objects.all()), pk=post_id)
+    )
+
+
+@api_view
+def comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return page(
+        request, Comment.objects.filter(post_id=post_id), CommentSerializer,
+        COMMENT_ORDERING,
+    )
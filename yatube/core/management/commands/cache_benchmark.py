@@ -0,0 +1,57 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SQLiteCache
+
+VALUE = {'html': 'x' * 2048, 'generation': 1}
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает задержку попаданий SQLiteCache и LocMemCache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--reads', type=int, default=20000)
+
+    def measure(self, backend, keys, reads):
+        for number in range(keys):
+            backend.set(f'key:{number}', VALUE)
+        timings = []
+        for number in range(reads):
+            started = time.perf_counter()
+            backend.get(f'key:{number % keys}')
+            timings.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        backend.set('counter', 0)
+        for _ in range(reads):
+            backend.incr('counter')
+        incr = (time.perf_counter() - started) / reads
+        timings.sort()
+        return {
+            'p50': statistics.median(timings),
+            'p95': timings[int(len(timings) * 0.95)],
+            'incr': incr,
+        }
+
+    def handle(self, *args, **options):
+        keys, reads = options['keys'], options['reads']
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                'LocMemCache': LocMemCache('benchmark', {}),
+                'SQLiteCache': SQLiteCache(
+                    os.path.join(directory, 'cache.sqlite3'),
+                    {'OPTIONS': {'MAX_ENTRIES': keys * 2}},
+                ),
+            }
+            for name, backend in backends.items():
+                result = self.measure(backend, keys, reads)
+                self.stdout.write(
+                    f'{name}: get p50 {result["p50"] * 1e6:.1f} мкс, '
+                    f'p95 {result["p95"] * 1e6:.1f} мкс, '
+                    f'incr {result["incr"] * 1e6:.1f} мкс'
+                )
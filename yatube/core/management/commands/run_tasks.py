@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core.queue import Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задания очереди core.queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=None,
+            help='Размер пула потоков (по умолчанию TASK_THREADS).',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задания и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(threads=options['threads'])
+        if options['once']:
+            done = worker.run_pending()
+            self.stdout.write(f'Выполнено заданий: {done}')
+            return
+        # По SIGTERM воркер доделывает взятые задания и выходит.
+        signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        self.stdout.write(f'Воркер {worker.name}, потоков: {worker.threads}')
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            worker.stop()
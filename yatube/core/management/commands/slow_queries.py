@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит самые затратные запросы из журнала медленных запросов '
+        'по суммарному времени.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--log', default=None)
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Выводить сохранённые планы запросов.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.SLOW_QUERY_LOG
+        groups = slow_queries.summarize(slow_queries.read(path))
+        if not groups:
+            raise CommandError(f'В журнале {path} нет записей.')
+        for group in groups[:options['limit']]:
+            self.stdout.write(
+                f'{group["fingerprint"]}  всего {group["total_ms"]:.1f} мс  '
+                f'запросов {group["count"]}  '
+                f'в среднем {group["total_ms"] / group["count"]:.1f} мс  '
+                f'максимум {group["max_ms"]:.1f} мс'
+            )
+            self.stdout.write(f'  view: {", ".join(sorted(group["views"]))}')
+            self.stdout.write(f'  {group["sql"]}')
+            if options['plans'] and group['plan']:
+                for line in group['plan']:
+                    self.stdout.write(f'    {line}')
@@ -0,0 +1,294 @@
+"""Метрики запросов в формате Prometheus.
+
+`core.middleware.MetricsMiddleware` замеряет для каждого имени view
+длительность запроса, число и суммарное время запросов к базе, время
+рендеринга шаблонов и попадания в кэш. Значения копятся в гистограммах
+и счётчиках процесса и отдаются по адресу /metrics/.
+
+При нескольких процессах-воркерах каждый из них раз в
+`METRICS_FLUSH_INTERVAL` секунд сохраняет свои значения в файл
+`<pid>.json` в каталоге `METRICS_DIR`, а /metrics/ складывает файлы всех
+воркеров. Без `METRICS_DIR` отдаются значения текущего процесса.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)
+
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': (
+        'Длительность обработки запроса.', LATENCY_BUCKETS
+    ),
+    'yatube_db_queries_per_request': (
+        'Число запросов к базе за запрос.', QUERY_BUCKETS
+    ),
+    'yatube_db_query_duration_seconds': (
+        'Суммарное время запросов к базе за запрос.', LATENCY_BUCKETS
+    ),
+    'yatube_template_render_duration_seconds': (
+        'Время рендеринга шаблонов за запрос.', LATENCY_BUCKETS
+    ),
+    'yatube_task_duration_seconds': (
+        'Длительность фонового задания.', LATENCY_BUCKETS
+    ),
+    'yatube_digest_batch_duration_seconds': (
+        'Время отправки пачки дайджестов.', LATENCY_BUCKETS
+    ),
+}
+COUNTERS = {
+    'yatube_cache_requests_total': 'Обращения к кэшу по результату.',
+    'yatube_tasks_total': 'Выполненные фоновые задания по результату.',
+    'yatube_digest_emails_total': 'Отправленные письма-дайджесты.',
+    'yatube_digest_notifications_total': 'События, доставленные в дайджестах.',
+    'yatube_digest_failures_total': 'Дайджесты, которые не удалось отправить.',
+}
+
+_current = ContextVar('metrics_request', default=None)
+
+
+class RequestStats:
+    __slots__ = (
+        'queries', 'query_seconds', 'template_seconds', 'template_depth',
+        'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._flushed = 0.0
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(HISTOGRAMS[name][1])
+                self._histograms[key] = histogram
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': [
+                    [name, list(labels), list(item.counts), item.sum]
+                    for (name, labels), item in self._histograms.items()
+                ],
+                'counters': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self._counters.items()
+                ],
+            }
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def flush(self, force=False):
+        """Сохраняет значения процесса в METRICS_DIR не чаще интервала."""
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (
+            not force
+            and now - self._flushed < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(path + '.tmp', path)
+
+
+REGISTRY = Registry()
+
+
+def _key(labels):
+    return tuple(tuple(pair) for pair in labels)
+
+
+def merge(snapshots):
+    """Складывает значения нескольких процессов."""
+    histograms, counters = {}, {}
+    for snapshot in snapshots:
+        for name, labels, counts, total in snapshot['histograms']:
+            key = (name, _key(labels))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+        for name, labels, value in snapshot['counters']:
+            key = (name, _key(labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def collect():
+    """Значения всех воркеров (или текущего процесса без METRICS_DIR)."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return merge([REGISTRY.snapshot()]), 1
+    REGISTRY.flush(force=True)
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return merge(snapshots), len(snapshots)
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + body + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    """Текст для Prometheus (text format 0.0.4)."""
+    (histograms, counters), workers = collect()
+    lines = [
+        '# HELP yatube_metrics_workers Число воркеров в отчёте.',
+        '# TYPE yatube_metrics_workers gauge',
+        f'yatube_metrics_workers {workers}',
+    ]
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), (counts, total) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                cumulative += count
+                le = _labels(labels, [('le', bound)])
+                lines.append(f'{name}_bucket{le} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    for name, description in COUNTERS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def start_request():
+    return _current.set(RequestStats())
+
+
+def finish_request(token, view, seconds):
+    stats = _current.get()
+    _current.reset(token)
+    labels = (('view', view),)
+    REGISTRY.observe('yatube_request_duration_seconds', labels, seconds)
+    REGISTRY.observe('yatube_db_queries_per_request', labels, stats.queries)
+    REGISTRY.observe(
+        'yatube_db_query_duration_seconds', labels, stats.query_seconds
+    )
+    REGISTRY.observe(
+        'yatube_template_render_duration_seconds', labels,
+        stats.template_seconds,
+    )
+    for result, count in (('hit', stats.cache_hits),
+                          ('miss', stats.cache_misses)):
+        if count:
+            REGISTRY.inc(
+                'yatube_cache_requests_total',
+                labels + (('result', result),),
+                count,
+            )
+    REGISTRY.flush()
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+@contextmanager
+def template_timer():
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    # Вложенные шаблоны уже входят во время внешнего.
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_seconds += time.perf_counter() - started
+
+
+def record_cache(hit):
+    stats = _current.get()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
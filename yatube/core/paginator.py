@@ -0,0 +1,218 @@
+"""Постраничный вывод по ключу (keyset/cursor pagination).
+
+Страница выбирается условием по полям сортировки, а не через OFFSET,
+поэтому глубокие страницы стоят столько же, сколько первая, а COUNT(*)
+не выполняется вовсе. Курсоры непрозрачны для клиента: это base64 от
+направления и значений ключа граничного объекта.
+"""
+import base64
+import binascii
+import copy
+import hashlib
+import json
+import math
+
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .stampede import get_or_compute
+
+DEFAULT_ORDERING = ('-pub_date', '-pk')
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorPaginator(Paginator):
+    """Paginator с курсорами по полям `ordering`.
+
+    Если `ordering` не передан, используется явная сортировка queryset,
+    а без неё — (pub_date, pk). Поля сортировки должны однозначно
+    упорядочивать объекты.
+
+    Возвращает обычные `Page` с атрибутами `next_cursor`, `previous_cursor`
+    и `last_cursor`. Номер страницы (`?page=N`) поддерживается для старых
+    ссылок, но без подсчёта страниц. Общее число объектов приблизительное:
+    COUNT(*) выполняется только при обращении к `count` и кэшируется на
+    `count_timeout` секунд по ключу `count_key` (по умолчанию — хеш SQL).
+    """
+
+    def __init__(self, object_list, per_page, ordering=None,
+                 with_total=False, count_timeout=300, count_key=None):
+        if ordering is None:
+            ordering = object_list.query.order_by or DEFAULT_ORDERING
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+        self.with_total = with_total
+        self.count_timeout = count_timeout
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        return get_or_compute(
+            self.count_key or f'paginator:count:{digest}',
+            self.object_list.count,
+            self.count_timeout,
+        )
+
+    def _field(self, name):
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        values = None
+        if obj is not None:
+            values = [getattr(obj, name) for name in self.fields]
+        return self._encode(direction, values)
+
+    def _encode(self, direction, values):
+        payload = json.dumps(
+            [direction, values],
+            default=lambda value: value.isoformat(),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, values = json.loads(base64.urlsafe_b64decode(cursor))
+            if direction not in (NEXT, PREVIOUS):
+                return None
+            if values is not None:
+                if len(values) != len(self.fields):
+                    return None
+                values = [
+                    self._field(name).to_python(value)
+                    for name, value in zip(self.fields, values)
+                ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            return None
+        return direction, values
+
+    def _keyset(self, values, direction):
+        forward = self.descending == (direction == NEXT)
+        lookup = 'lt' if forward else 'gt'
+        condition = Q()
+        for position, name in enumerate(self.fields):
+            equal = dict(zip(self.fields[:position], values[:position]))
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[position]})
+        # Отдельное условие на первое поле позволяет базе начать чтение
+        # индекса сразу с нужного места, а не фильтровать его с начала.
+        bound = Q(**{f'{self.fields[0]}__{lookup}e': values[0]})
+        return bound & condition
+
+    def _rows(self, queryset):
+        rows = list(queryset[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def _page(self, rows, number, has_next):
+        # Page сама определяет соседей по num_pages, поэтому странице
+        # достаётся копия paginator, где num_pages известен без COUNT(*).
+        window = copy.copy(self)
+        window.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, window)
+        page.next_cursor = page.previous_cursor = page.last_cursor = None
+        page.cache_key = None
+        if has_next:
+            page.next_cursor = self.encode_cursor(rows[-1], NEXT)
+            page.last_cursor = self.encode_cursor(None, PREVIOUS)
+        if number > 1 and rows:
+            page.previous_cursor = self.encode_cursor(rows[0], PREVIOUS)
+        return page
+
+    def page_key(self, number=None, cursor=None):
+        """Ключ страницы для кэша, без загрузки объектов.
+
+        Запросы, которые покажут одну и ту же страницу (`?page=abc` и
+        `?page=1`, номер за концом и последняя страница), получают один
+        ключ.
+        """
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None or position == (NEXT, None):
+            number = self._number(number)
+            if number > 1:
+                # Число объектов кэшируется, COUNT(*) бывает редко.
+                last = max(math.ceil(self.count / self.per_page), 1)
+                number = min(number, last)
+            return f'page:{number}'
+        cursor = self._encode(*position)
+        return f'cursor:{hashlib.md5(cursor.encode()).hexdigest()}'
+
+    def get_page(self, number=None, cursor=None):
+        return self._page(*self.window(number, cursor))
+
+    def window(self, number=None, cursor=None):
+        """Объекты страницы, её номер и есть ли следующая страница."""
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None or position == (NEXT, None):
+            return self._offset_page(number)
+        direction, values = position
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._keyset(values, direction))
+        if direction == NEXT:
+            rows, has_more = self._rows(queryset)
+            if not rows:
+                # Курсор за концом списка: объекты удалены — последняя
+                # страница.
+                return self.window(cursor=self.encode_cursor(None, PREVIOUS))
+            return rows, 2, has_more
+        rows, has_more = self._rows(queryset.reverse())
+        if not has_more:
+            return self._offset_page(1)
+        rows.reverse()
+        return rows, 2, values is not None
+
+    @staticmethod
+    def _number(number):
+        try:
+            return max(int(number), 1)
+        except (TypeError, ValueError):
+            return 1
+
+    def _offset_page(self, number):
+        number = self._number(number)
+        offset = (number - 1) * self.per_page
+        rows, has_more = self._rows(self.object_list[offset:])
+        if not rows and number > 1:
+            # Как Paginator.get_page: номер за концом — последняя страница.
+            last = max(math.ceil(self.count / self.per_page), 1)
+            if last >= number:
+                # Число объектов из кэша устарело.
+                last = 1
+            return self._offset_page(last)
+        return rows, number, has_more
+
+
+def paginate(request, object_list, per_page, cache_key=None, timeout=None,
+             **kwargs):
+    """Страница `object_list` по параметрам `cursor` и `page` запроса.
+
+    С `cache_key` объекты страницы и её положение берутся из кэша по
+    ключу `cache_key:<ключ страницы>`, который остаётся у страницы в
+    атрибуте `cache_key`. Число объектов тогда кэшируется по ключу
+    `cache_key:count`, чтобы номер страницы в ключе считался по тем же
+    данным, что и сами страницы.
+    """
+    if cache_key is not None:
+        kwargs.setdefault('count_key', f'{cache_key}:count')
+        kwargs.setdefault('count_timeout', timeout)
+    paginator = CursorPaginator(object_list, per_page, **kwargs)
+    number, cursor = request.GET.get('page'), request.GET.get('cursor')
+    if cache_key is None:
+        return paginator.get_page(number=number, cursor=cursor)
+    key = f'{cache_key}:{paginator.page_key(number, cursor)}'
+    page = paginator._page(*get_or_compute(
+        key, lambda: paginator.window(number, cursor), timeout
+    ))
+    page.cache_key = key
+    return page
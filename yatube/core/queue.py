@@ -0,0 +1,300 @@
+"""Очередь фоновых заданий в базе данных.
+
+Функция-задание объявляется декоратором `task` в модуле `tasks`
+приложения и ставится в очередь вызовом `.delay(...)`:
+
+    @task(priority=10)
+    def fan_out_post(post_id):
+        ...
+
+    fan_out_post.delay(post.pk)
+
+Задание — строка таблицы Task, которая вставляется в той же транзакции,
+что и изменения запроса: воркер не увидит задание раньше, чем
+зафиксируются данные, а откат запроса отменяет и задание. Аргументы
+сохраняются в JSON, поэтому передаются id, а не объекты.
+
+Команда `run_tasks` берёт задания по приоритету и времени, выполняет их
+в пуле потоков, а упавшие возвращает в очередь с экспоненциальной
+задержкой до `max_attempts` попыток. Задание забирается условным UPDATE
+по состоянию, так что несколько процессов `run_tasks` не выполнят одно
+задание дважды.
+
+Взятое задание арендовано: в `locked_by` записывается метка аренды
+(имя воркера и случайный суффикс), а воркер продлевает `locked_at`
+своих заданий каждую треть `TASK_TIMEOUT`. Задание, аренду которого
+не продлевали дольше `TASK_TIMEOUT`, считается брошенным умершим
+воркером и возвращается в очередь. Результат записывается только по
+своей аренде, поэтому опоздавший воркер не удалит и не изменит задание,
+которое уже взял другой.
+
+При TASKS_EAGER задания выполняются сразу при `.delay()` — так очередь
+работает без воркера, например в тестах.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .metrics import REGISTRY
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит задание в очередь с параметрами по умолчанию."""
+        return enqueue(self.name, args, kwargs)
+
+
+def task(name=None, priority=0, max_attempts=None):
+    """Регистрирует функцию как фоновое задание."""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        wrapper = TaskFunction(func, task_name, priority, max_attempts)
+        _registry[task_name] = wrapper
+        return wrapper
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, priority=None, countdown=0):
+    """Ставит задание в очередь; при TASKS_EAGER выполняет его сразу."""
+    function = _registry[name]
+    kwargs = kwargs or {}
+    if settings.TASKS_EAGER:
+        function(*args, **kwargs)
+        return None
+    return Task.objects.create(
+        name=name,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs}),
+        priority=function.priority if priority is None else priority,
+        max_attempts=function.max_attempts or settings.TASK_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой, с разбросом ±50%."""
+    delay = min(
+        settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASK_RETRY_MAX_DELAY,
+    )
+    return delay * random.uniform(0.5, 1.5)
+
+
+def claim(worker, limit):
+    """Забирает до limit готовых к выполнению заданий.
+
+    У каждого взятого задания в `locked_by` своя метка аренды.
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at', 'pk').values_list('pk', flat=True)
+    claimed = [
+        pk for pk in list(candidates[:limit])
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING,
+            locked_by=f'{worker}/{uuid.uuid4().hex[:8]}',
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(
+        Task.objects.filter(pk__in=claimed)
+        .order_by('-priority', 'run_at', 'pk')
+    )
+
+
+def renew(leases):
+    """Продлевает аренду выполняемых заданий с метками leases."""
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_by__in=leases
+    ).update(locked_at=timezone.now())
+
+
+def requeue_stale():
+    """Возвращает в очередь задания, аренду которых не продлевали."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=deadline)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, last_error='Превышено время выполнения.'
+    )
+    return stale.update(status=Task.QUEUED, locked_by='', locked_at=None)
+
+
+def _finish(task, error):
+    # Только своё задание: после потери аренды его мог взять другой воркер.
+    leased = Task.objects.filter(
+        pk=task.pk, status=Task.RUNNING, locked_by=task.locked_by
+    )
+    if error is None:
+        result, changed = 'done', leased.delete()[0]
+    elif task.attempts >= task.max_attempts:
+        result, changed = 'failed', leased.update(
+            status=Task.FAILED, last_error=error
+        )
+    else:
+        result, changed = 'retry', leased.update(
+            status=Task.QUEUED,
+            locked_by='',
+            locked_at=None,
+            run_at=timezone.now() + timedelta(
+                seconds=retry_delay(task.attempts)
+            ),
+            last_error=error,
+        )
+    if not changed:
+        logger.warning('Задание %s потеряло аренду', task)
+        return 'lost'
+    return result
+
+
+def execute(task):
+    """Выполняет взятое задание и возвращает результат.
+
+    Результат: done, retry, failed или lost, если аренда потеряна.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        function = _registry.get(task.name)
+        if function is None:
+            raise LookupError(f'Неизвестное задание {task.name}')
+        payload = json.loads(task.payload)
+        function(*payload['args'], **payload['kwargs'])
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задание %s упало', task)
+    duration = time.perf_counter() - started
+    result = _finish(task, error)
+    labels = (('task', task.name),)
+    REGISTRY.observe('yatube_task_duration_seconds', labels, duration)
+    REGISTRY.inc('yatube_tasks_total', labels + (('result', result),))
+    REGISTRY.flush()
+    return result
+
+
+class Worker:
+    """Выполняет задания очереди в пуле из threads потоков."""
+
+    def __init__(self, threads=None, poll_interval=None):
+        autodiscover_modules('tasks')
+        self.threads = threads or settings.TASK_THREADS
+        self.poll_interval = poll_interval or settings.TASK_POLL_INTERVAL
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.leases = set()
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """Не брать новых заданий и выйти после текущих."""
+        self.stopping.set()
+
+    def renew(self):
+        """Продлевает аренду выполняемых заданий и возвращает их число."""
+        with self._lock:
+            leases = list(self.leases)
+        return renew(leases) if leases else 0
+
+    def execute(self, task):
+        with self._lock:
+            self.leases.add(task.locked_by)
+        try:
+            return execute(task)
+        finally:
+            with self._lock:
+                self.leases.discard(task.locked_by)
+
+    def _execute_in_thread(self, task):
+        try:
+            return self.execute(task)
+        finally:
+            # Как после запроса: поток пула не держит сломанное соединение.
+            close_old_connections()
+
+    def _heartbeat(self, done):
+        while not done.wait(settings.TASK_TIMEOUT / 3):
+            try:
+                self.renew()
+            except Exception:
+                logger.exception('Не удалось продлить аренду заданий')
+        connection.close()
+
+    def run_pending(self):
+        """Выполняет все готовые задания и возвращает их число.
+
+        С одним потоком задания выполняются в текущем потоке. Аренду
+        продлевает отдельный поток.
+        """
+        requeue_stale()
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(finished,),
+            name='tasks-heartbeat', daemon=True,
+        )
+        heartbeat.start()
+        try:
+            return self._run_pending()
+        finally:
+            finished.set()
+            heartbeat.join()
+
+    def _run_pending(self):
+        done = 0
+        if self.threads == 1:
+            while not self.stopping.is_set():
+                tasks = claim(self.name, 1)
+                if not tasks:
+                    break
+                self.execute(tasks[0])
+                done += 1
+            return done
+        with ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix='tasks'
+        ) as executor:
+            running = set()
+            while not self.stopping.is_set():
+                tasks = claim(self.name, self.threads - len(running))
+                running.update(
+                    executor.submit(self._execute_in_thread, task)
+                    for task in tasks
+                )
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                done += len(finished)
+            wait(running)
+        return done + len(running)
+
+    def run(self):
+        """Выполняет задания, пока не будет вызван stop()."""
+        while not self.stopping.is_set():
+            close_old_connections()
+            if not self.run_pending():
+                self.stopping.wait(self.poll_interval)
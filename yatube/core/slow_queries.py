@@ -0,0 +1,163 @@
+"""Журнал медленных запросов к базе.
+
+Включается настройкой `SLOW_QUERY_THRESHOLD` (порог в миллисекундах):
+`core.middleware.SlowQueryMiddleware` оборачивает выполнение запросов, и
+каждый запрос дольше порога записывается строкой JSON в файл
+`SLOW_QUERY_LOG`. Запросы одной формы объединяются
+отпечатком SQL без параметров; сами параметры в журнал не пишутся, только
+их отпечаток. План (`EXPLAIN QUERY PLAN` для SQLite) снимается один раз
+на отпечаток в процессе. Сводку строит команда `slow_queries`.
+
+В файл пишут все воркеры узла, поэтому сами они его не ротируют: каждый
+процесс переименовывал бы файл независимо, и записи терялись бы. Ротацию
+делает внешний logrotate (`rotate 5`, без сжатия или с `delaycompress`),
+а `WatchedFileHandler` после переименования открывает новый файл. Команда
+читает `SLOW_QUERY_LOG` и до `SLOW_QUERY_LOG_BACKUPS` файлов `.1`, `.2`...
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from logging.handlers import WatchedFileHandler
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger('yatube.slow_queries')
+logger.propagate = False
+
+SPACES = re.compile(r'\s+')
+PLACEHOLDERS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+_explained = set()
+_lock = threading.Lock()
+_handler = None
+
+
+def normalize(sql):
+    """SQL без различий в пробелах и длине списков IN (...)."""
+    return PLACEHOLDERS.sub('(...)', SPACES.sub(' ', sql).strip())
+
+
+def fingerprint(value):
+    return hashlib.sha1(value.encode()).hexdigest()[:16]
+
+
+def _log():
+    global _handler
+    path = os.path.abspath(settings.SLOW_QUERY_LOG)
+    with _lock:
+        if _handler is None or _handler.baseFilename != path:
+            if _handler is not None:
+                logger.removeHandler(_handler)
+                _handler.close()
+            _handler = WatchedFileHandler(
+                path, encoding='utf-8', delay=True
+            )
+            logger.addHandler(_handler)
+            logger.setLevel(logging.INFO)
+    return logger
+
+
+def _first_time(key):
+    with _lock:
+        if key in _explained:
+            return False
+        _explained.add(key)
+        return True
+
+
+def explain(connection, sql, params):
+    """План запроса или None, если его нельзя получить."""
+    if sql.split(None, 1)[0].upper() not in ('SELECT', 'WITH'):
+        return None
+    # Курсор самого backend'а не проходит через execute_wrapper.
+    cursor = connection.create_cursor()
+    try:
+        prefix = connection.ops.explain_query_prefix()
+        cursor.execute(f'{prefix} {sql}', params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+    finally:
+        cursor.close()
+
+
+class SlowQueryWrapper:
+    """Обёртка для connection.execute_wrapper.
+
+    origin — функция без аргументов, возвращающая имя источника
+    запросов, например имя view.
+    """
+
+    def __init__(self, threshold, origin):
+        self.threshold = threshold / 1000
+        self.origin = origin
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.record(sql, params, many, context['connection'], duration)
+        return result
+
+    def record(self, sql, params, many, connection, duration):
+        shape = normalize(sql)
+        key = fingerprint(shape)
+        entry = {
+            'time': timezone.now().isoformat(),
+            'view': self.origin(),
+            'fingerprint': key,
+            'sql': shape,
+            'params_fingerprint': fingerprint(repr(params)),
+            'duration_ms': round(duration * 1000, 3),
+        }
+        if not many and _first_time((connection.alias, key)):
+            entry['plan'] = explain(connection, sql, params)
+        _log().info(json.dumps(entry, ensure_ascii=False))
+
+
+def read(path):
+    """Записи журнала вместе с ротированными файлами, от старых к новым."""
+    paths = [
+        f'{path}.{number}'
+        for number in range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)
+    ] + [path]
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries):
+    """Статистика по отпечаткам, по убыванию суммарного времени."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'sql': entry['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': set(),
+            'plan': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['views'].add(entry['view'])
+        if entry.get('plan'):
+            group['plan'] = entry['plan']
+    return sorted(
+        groups.values(), key=lambda group: group['total_ms'], reverse=True
+    )
@@ -0,0 +1,112 @@
+"""Кэширование без «лавины» пересчётов (cache stampede).
+
+`get_or_compute` хранит вместе со значением мягкий срок годности и время
+последнего вычисления. Запись живёт в кэше дольше срока на `grace`
+секунд, и пока её пересчитывает один воркер (блокировка через
+`cache.add`), остальные отдают старое значение. Незадолго до истечения
+срока запись с растущей вероятностью пересчитывается заранее (XFetch):
+чем дороже вычисление, тем раньше, поэтому одновременно истекающих
+записей почти не бывает.
+
+Для фрагментов шаблонов есть тег `{% cache %}` из библиотеки
+`stampede` с тем же синтаксисом, что у встроенного, для функций —
+декоратор `cached`.
+"""
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+
+from django.core.cache import cache as default_cache
+from django.db.models.query import QuerySet
+
+LOCK_TIMEOUT = 30
+WAIT_STEP = 0.05
+
+
+def _hard_timeout(timeout, grace):
+    if timeout is None:
+        return None
+    return timeout + (timeout if grace is None else grace)
+
+
+def _fresh(entry, beta):
+    _, expires, delta = entry
+    if expires is None:
+        return True
+    # Вероятностный ранний пересчёт: -log(random) > 0 сдвигает «сейчас»
+    # вперёд пропорционально времени вычисления.
+    early = delta * beta * -math.log(1 - random.random())
+    return time.time() + early < expires
+
+
+def _store(cache, key, compute, timeout, grace):
+    started = time.monotonic()
+    value = compute()
+    if isinstance(value, QuerySet):
+        value = list(value)
+    delta = time.monotonic() - started
+    expires = None if timeout is None else time.time() + timeout
+    cache.set(key, (value, expires, delta), _hard_timeout(timeout, grace))
+    return value
+
+
+def get_or_compute(key, compute, timeout, cache=None, grace=None, beta=1.0,
+                   lock_timeout=LOCK_TIMEOUT):
+    """Значение из кэша; пересчитывает его только один воркер.
+
+    timeout — срок годности в секундах (None — бессрочно), grace — сколько
+    ещё отдавать устаревшее значение во время пересчёта (по умолчанию
+    равно timeout).
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None and _fresh(entry, beta):
+        return entry[0]
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, lock_timeout):
+        try:
+            return _store(cache, key, compute, timeout, grace)
+        finally:
+            cache.delete(lock)
+    if entry is not None:
+        return entry[0]
+    # Значения ещё нет совсем: ждём, пока его вычислит владелец
+    # блокировки, но не дольше срока блокировки.
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if cache.get(lock) is None:
+            break
+    return _store(cache, key, compute, timeout, grace)
+
+
+def cached(timeout, key=None, **options):
+    """Декоратор: результат функции через get_or_compute.
+
+    Ключ строится из имени функции и аргументов или функцией key с теми
+    же аргументами. Возвращённый QuerySet сохраняется списком.
+    """
+    def decorator(func):
+        prefix = f'cached:{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if key is not None:
+                suffix = key(*args, **kwargs)
+            else:
+                suffix = hashlib.md5(
+                    repr((args, sorted(kwargs.items()))).encode()
+                ).hexdigest()
+            return get_or_compute(
+                f'{prefix}:{suffix}',
+                lambda: func(*args, **kwargs),
+                timeout,
+                **options,
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,123 @@
+"""Статические файлы с хешами в именах и заранее сжатыми копиями.
+
+`CompressedManifestStaticFilesStorage` при collectstatic добавляет к
+именам файлов хеш содержимого (`bootstrap.min.3c2e8a1b9f0d.css`) и
+кладёт рядом сжатые копии `.gz`. Шаблоны получают такие имена через
+`{% static %}`, поэтому при изменении файла меняется и его адрес.
+
+`StaticFilesApplication` — WSGI-обёртка, которая отдаёт файлы из
+STATIC_ROOT без Django: сжатую копию клиентам с поддержкой gzip, а файлам
+с хешем в имени — заголовок Cache-Control на год.
+"""
+import gzip
+import mimetypes
+import os
+import re
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.http import http_date, parse_http_date_safe
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.json', '.txt', '.xml')
+HASHED = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        if not self.hashed_files:
+            # До collectstatic (разработка, тесты) манифеста нет, и файлы
+            # отдаются под исходными именами. Файл, которого нет в
+            # загруженном манифесте, — ошибка, как в Django.
+            return name
+        return super().stored_name(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            content = file.read()
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content):
+            return
+        with open(path + '.gz', 'wb') as file:
+            file.write(compressed)
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in sorted(names):
+                self.compress(name)
+
+
+def accepts_gzip(header):
+    for part in header.split(','):
+        coding, _, parameters = part.partition(';')
+        if coding.strip().lower() in ('gzip', '*'):
+            quality = parameters.replace(' ', '').lower()
+            return not re.fullmatch(r'q=0(\.0*)?', quality)
+    return False
+
+
+class StaticFilesApplication:
+    """Отдаёт файлы STATIC_ROOT, остальные запросы передаёт application."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = os.path.abspath(root or settings.STATIC_ROOT)
+        self.prefix = prefix or settings.STATIC_URL
+
+    def find(self, path_info):
+        if not path_info.startswith(self.prefix):
+            return None
+        path = os.path.normpath(
+            os.path.join(self.root, path_info[len(self.prefix):])
+        )
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def __call__(self, environ, start_response):
+        path = None
+        if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            path = self.find(environ.get('PATH_INFO', ''))
+        if path is None:
+            return self.application(environ, start_response)
+        return self.serve(path, environ, start_response)
+
+    def serve(self, path, environ, start_response):
+        content_type, _ = mimetypes.guess_type(path)
+        headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Cache-Control',
+             IMMUTABLE if HASHED.search(path) else REVALIDATE),
+        ]
+        compressed = path + '.gz'
+        if os.path.isfile(compressed):
+            headers.append(('Vary', 'Accept-Encoding'))
+            if accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING', '')):
+                path = compressed
+                headers.append(('Content-Encoding', 'gzip'))
+        stat = os.stat(path)
+        headers.append(('Last-Modified', http_date(stat.st_mtime)))
+        since = parse_http_date_safe(
+            environ.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        if since is not None and int(stat.st_mtime) <= since:
+            start_response('304 Not Modified', headers)
+            return []
+        headers.append(('Content-Length', str(stat.st_size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return wrapper(open(path, 'rb'))
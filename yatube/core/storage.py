@@ -0,0 +1,54 @@
+"""Хранилище файлов с именами по содержимому.
+
+Файл сохраняется под именем из SHA-256 его содержимого, поэтому одна и
+та же картинка, загруженная много раз, лежит на диске в одном экземпляре,
+а её миниатюры sorl.thumbnail создаются один раз: их ключи зависят от
+имени файла. Хеш считается во время записи во временный файл, без
+повторного чтения загрузки.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+TEMPORARY_PREFIX = '.upload-'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Окончательное имя задаёт содержимое файла в _save.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        digest = hashlib.sha256()
+        temporary = tempfile.NamedTemporaryFile(
+            dir=full_directory, prefix=TEMPORARY_PREFIX, delete=False
+        )
+        try:
+            with temporary:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temporary.write(chunk)
+            name = posixpath.join(directory, digest.hexdigest() + extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.unlink(temporary.name)
+                # Свежее время изменения защищает повторно использованный
+                # файл от сборки мусора, пока пост ещё не сохранён.
+                os.utime(path)
+            else:
+                os.chmod(temporary.name, self.file_permissions_mode or 0o644)
+                os.replace(temporary.name, path)
+        except BaseException:
+            if os.path.exists(temporary.name):
+                os.unlink(temporary.name)
+            raise
+        return name
@@ -0,0 +1,62 @@
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Library, TemplateSyntaxError, VariableDoesNotExist
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.stampede import get_or_compute
+
+register = Library()
+
+
+class StampedeCacheNode(CacheNode):
+    def _resolve(self, variable, context):
+        try:
+            return variable.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError(
+                f'"cache" tag got an unknown variable: {variable.var!r}'
+            )
+
+    def fragment_cache(self, context):
+        if self.cache_name:
+            name = self._resolve(self.cache_name, context)
+            try:
+                return caches[name]
+            except InvalidCacheBackendError:
+                raise TemplateSyntaxError(
+                    f'Invalid cache name specified for cache tag: {name!r}'
+                )
+        try:
+            return caches['template_fragments']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def render(self, context):
+        timeout = self._resolve(self.expire_time_var, context)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (ValueError, TypeError):
+                raise TemplateSyntaxError(
+                    f'"cache" tag got a non-integer timeout value: {timeout!r}'
+                )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_compute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            timeout,
+            cache=self.fragment_cache(context),
+        )
+
+
+@register.tag('cache')
+def do_stampede_cache(parser, token):
+    """Тег {% cache %} с защитой от одновременного пересчёта.
+
+    Синтаксис тот же, что у встроенного тега, см. core.stampede.
+    """
+    node = do_cache(parser, token)
+    return StampedeCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name,
+    )
@@ -0,0 +1,425 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import metrics, queue, slow_queries, stampede
+from .cache_backends import SQLiteCache
+from .models import Task
+from .staticfiles import (CompressedManifestStaticFilesStorage,
+                          StaticFilesApplication)
+
+User = get_user_model()
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_ENTRIES': 10}}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_values_are_shared_between_instances(self):
+        """Разные процессы видят один и тот же кэш."""
+        self.cache.set('key', {'value': 1})
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('key'), {'value': 1})
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr_and_add(self):
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.incr('counter', 10), 12)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_values_are_not_returned(self):
+        self.cache.set('key', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_least_recently_used_entries_are_culled(self):
+        """При переполнении вытесняются давно не читавшиеся записи."""
+        for number in range(10):
+            self.cache.set(f'key:{number}', number)
+        now = time.time()
+        connection = self.cache._connection()
+        connection.execute('UPDATE cache SET accessed = ?', (now - 60,))
+        self.cache.get('key:0')
+        self.cache.set('key:10', 10)
+        self.assertEqual(self.cache.get('key:0'), 0)
+        self.assertEqual(self.cache.get('key:10'), 10)
+        self.assertIsNone(self.cache.get('key:1'))
+
+    def test_size_is_checked_once_per_interval(self):
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 1, 'CULL_CHECK_INTERVAL': 1000},
+        })
+        with mock.patch('core.cache_backends.random.random', return_value=0.5):
+            for number in range(5):
+                cache.set(f'key:{number}', number)
+        self.assertEqual(len(cache.keys()), 5)
+        with mock.patch('core.cache_backends.random.random', return_value=0):
+            cache.set('key:5', 5)
+        self.assertLess(len(cache.keys()), 6)
+
+    def test_keys_by_prefix(self):
+        self.cache.set('thumb_1%', 1)
+        self.cache.set('thumbx', 2)
+        self.cache.set('other', 3)
+        self.assertEqual(self.cache.keys('thumb_'), ['thumb_1%'])
+        self.assertEqual(
+            sorted(self.cache.keys()), ['other', 'thumb_1%', 'thumbx']
+        )
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.REGISTRY.clear()
+        self.client = Client()
+
+    def scrape(self, **extra):
+        return self.client.get(reverse('metrics'), **extra)
+
+    def test_view_metrics_are_exposed(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape().content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn('yatube_db_queries_per_request_bucket'
+                      '{view="posts:index",le="+Inf"} 2', text)
+        self.assertIn('yatube_template_render_duration_seconds_count'
+                      '{view="posts:index"} 2', text)
+        self.assertIn('yatube_cache_requests_total'
+                      '{view="posts:index",result="hit"}', text)
+
+    def test_query_count_is_recorded(self):
+        token = metrics.start_request()
+        with connection.execute_wrapper(metrics.query_wrapper):
+            User.objects.count()
+            User.objects.exists()
+        metrics.finish_request(token, 'test', 0.01)
+        histograms, _ = metrics.merge([metrics.REGISTRY.snapshot()])
+        _, total = histograms[
+            ('yatube_db_queries_per_request', (('view', 'test'),))
+        ]
+        self.assertEqual(total, 2)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint_requires_internal_address_or_token(self):
+        outside = {'REMOTE_ADDR': '10.0.0.1'}
+        self.assertEqual(self.scrape(**outside).status_code, 404)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer secret', **outside)
+        self.assertEqual(response.status_code, 200)
+
+    def test_workers_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = metrics.Registry()
+            other.observe(
+                'yatube_request_duration_seconds', (('view', 'x'),), 0.5
+            )
+            with open(os.path.join(directory, '1.json'), 'w') as file:
+                json.dump(other.snapshot(), file)
+            metrics.REGISTRY.observe(
+                'yatube_request_duration_seconds', (('view', 'x'),), 0.5
+            )
+            with override_settings(METRICS_DIR=directory):
+                text = metrics.exposition()
+        self.assertIn('yatube_metrics_workers 2', text)
+        self.assertIn('yatube_request_duration_seconds_count{view="x"} 2',
+                      text)
+
+
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = os.path.join(self.directory, 'slow.log')
+        slow_queries._explained.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def entries(self):
+        with open(self.log, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_slow_queries_are_logged_with_plan_once(self):
+        wrapper = slow_queries.SlowQueryWrapper(0, lambda: 'test')
+        with override_settings(SLOW_QUERY_LOG=self.log):
+            with connection.execute_wrapper(wrapper):
+                list(User.objects.filter(pk__in=[1, 2]))
+                list(User.objects.filter(pk__in=[3, 4, 5]))
+            first, second = self.entries()
+            self.assertEqual(first['view'], 'test')
+            self.assertEqual(first['fingerprint'], second['fingerprint'])
+            self.assertNotEqual(
+                first['params_fingerprint'], second['params_fingerprint']
+            )
+            self.assertTrue(first['plan'])
+            self.assertNotIn('plan', second)
+
+            out = StringIO()
+            call_command('slow_queries', '--plans', stdout=out)
+        self.assertIn(f'{first["fingerprint"]}  всего', out.getvalue())
+        self.assertIn('запросов 2', out.getvalue())
+
+    def test_log_is_reopened_after_external_rotation(self):
+        wrapper = slow_queries.SlowQueryWrapper(0, lambda: 'test')
+        with override_settings(SLOW_QUERY_LOG=self.log):
+            with connection.execute_wrapper(wrapper):
+                User.objects.count()
+                os.rename(self.log, f'{self.log}.1')
+                User.objects.exists()
+            self.assertEqual(len(self.entries()), 1)
+            self.assertEqual(len(list(slow_queries.read(self.log))), 2)
+
+    def test_fast_queries_are_not_logged(self):
+        wrapper = slow_queries.SlowQueryWrapper(60000, lambda: 'test')
+        with override_settings(SLOW_QUERY_LOG=self.log):
+            with connection.execute_wrapper(wrapper):
+                User.objects.count()
+        self.assertFalse(os.path.exists(self.log))
+
+
+class StampedeTests(TestCase):
+    def setUp(self):
+        self.cache = LocMemCache('stampede-tests', {})
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def get(self, **options):
+        return stampede.get_or_compute(
+            'key', self.compute, 60, cache=self.cache, **options
+        )
+
+    def test_value_is_computed_once(self):
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_served_while_another_worker_recomputes(self):
+        self.cache.set('key', ('stale', time.time() - 1, 0.1), 60)
+        self.cache.add('key:lock', 1)
+        self.assertEqual(self.get(), 'stale')
+        self.assertEqual(self.calls, 0)
+        self.cache.delete('key:lock')
+        self.assertEqual(self.get(), 1)
+
+    def test_expensive_value_is_refreshed_early(self):
+        self.cache.set('key', ('old', time.time() + 10, 100), 60)
+        with mock.patch('core.stampede.random.random', return_value=0.5):
+            self.assertEqual(self.get(), 1)
+
+    def test_cached_decorator(self):
+        @stampede.cached(60, cache=self.cache)
+        def users(username):
+            self.calls += 1
+            return User.objects.filter(username=username)
+
+        self.assertEqual(users('nobody'), [])
+        self.assertEqual(users('nobody'), [])
+        self.assertEqual(self.calls, 1)
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load stampede %}{% cache 60 fragment name %}'
+            '{{ value }}{% endcache %}'
+        )
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'stampede-template',
+        }}):
+            first = template.render(Context({'name': 'a', 'value': 1}))
+            second = template.render(Context({'name': 'a', 'value': 2}))
+        self.assertEqual((first, second), ('1', '1'))
+
+
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.settings = override_settings(STATIC_ROOT=cls.root)
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def call(self, path, **environ):
+        def application(environ, start_response):
+            start_response('404 Not Found', [])
+            return [b'django']
+
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **environ}
+        result = {}
+
+        def start_response(status, headers):
+            result.update(status=status, headers=dict(headers))
+
+        body = b''.join(StaticFilesApplication(application)(
+            environ, start_response
+        ))
+        return result['status'], result['headers'], body
+
+    def test_hashed_file_is_served_compressed_and_immutable(self):
+        url = static('css/bootstrap.min.css')
+        self.assertRegex(url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        status, headers, body = self.call(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', headers['Cache-Control'])
+        with open(os.path.join(self.root, 'css', 'bootstrap.min.css'),
+                  'rb') as file:
+            self.assertEqual(gzip.decompress(body), file.read())
+        _, headers, _ = self.call(url)
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test_missing_manifest_entry_raises(self):
+        with self.assertRaises(ValueError):
+            static('css/missing.css')
+
+    def test_unhashed_names_without_manifest(self):
+        storage = CompressedManifestStaticFilesStorage(
+            location=tempfile.mkdtemp(dir=self.root)
+        )
+        self.assertEqual(
+            storage.url('css/bootstrap.min.css'),
+            '/static/css/bootstrap.min.css',
+        )
+
+    def test_other_paths_go_to_django(self):
+        for path in ('/static/../manage.py', '/static/missing.css', '/'):
+            self.assertEqual(self.call(path)[2], b'django')
+
+
+calls = []
+
+
+@queue.task(name='tests.record', priority=1)
+def record(value):
+    calls.append(value)
+
+
+@queue.task(name='tests.urgent', priority=5)
+def urgent(value):
+    calls.append(value)
+
+
+@queue.task(name='tests.broken', max_attempts=2)
+def broken():
+    raise ValueError('сломано')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        metrics.REGISTRY.clear()
+        self.worker = queue.Worker(threads=1)
+
+    def test_priority_order_and_metrics(self):
+        record.delay('first')
+        urgent.delay('urgent')
+        record.delay('second')
+        queue.enqueue('tests.record', ['later'], countdown=60)
+        self.assertEqual(calls, [])
+        self.assertEqual(self.worker.run_pending(), 3)
+        self.assertEqual(calls, ['urgent', 'first', 'second'])
+        self.assertEqual(Task.objects.get().payload, json.dumps(
+            {'args': ['later'], 'kwargs': {}}
+        ))
+        snapshot = metrics.REGISTRY.snapshot()
+        self.assertIn(
+            ['yatube_tasks_total',
+             [('task', 'tests.record'), ('result', 'done')], 2],
+            snapshot['counters'],
+        )
+
+    def test_retry_with_backoff_then_fail(self):
+        broken.delay()
+        with self.assertLogs('core.queue', 'ERROR'):
+            self.worker.run_pending()
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('сломано', task.last_error)
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.queue', 'ERROR'):
+            self.worker.run_pending()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_claim_is_exclusive_and_stale_tasks_return(self):
+        record.delay('value')
+        self.assertEqual(len(queue.claim('first', 10)), 1)
+        self.assertEqual(queue.claim('second', 10), [])
+        Task.objects.update(locked_at=timezone.now() - timedelta(
+            seconds=settings.TASK_TIMEOUT + 1
+        ))
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(calls, ['value'])
+
+    def test_late_worker_does_not_touch_reclaimed_task(self):
+        """После потери аренды результат первого воркера не записывается."""
+        record.delay('value')
+        task = queue.claim('first', 1)[0]
+        Task.objects.update(locked_at=timezone.now() - timedelta(
+            seconds=settings.TASK_TIMEOUT + 1
+        ))
+        self.assertEqual(queue.requeue_stale(), 1)
+        reclaimed = queue.claim('second', 1)[0]
+        with self.assertLogs('core.queue', 'WARNING'):
+            self.assertEqual(queue.execute(task), 'lost')
+        self.assertEqual(Task.objects.get().locked_by, reclaimed.locked_by)
+        self.assertEqual(queue.execute(reclaimed), 'done')
+        self.assertFalse(Task.objects.exists())
+
+    def test_renewed_lease_is_not_stale(self):
+        record.delay('value')
+        task = queue.claim(self.worker.name, 1)[0]
+        Task.objects.update(locked_at=timezone.now() - timedelta(
+            seconds=settings.TASK_TIMEOUT + 1
+        ))
+        self.worker.leases.add(task.locked_by)
+        self.assertEqual(self.worker.renew(), 1)
+        self.assertEqual(queue.requeue_stale(), 0)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_runs_immediately(self):
+        self.assertIsNone(record.delay('now'))
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Task.objects.exists())
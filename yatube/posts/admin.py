@@ -3,6 +3,14 @@ from django.contrib import admin
 from yatube.settings import EMPTY_VALUE_DISPLAY
 
 from .models import Comment, Follow, Group, Post
+from .search import filter_by_text
+
+
+class FullTextSearchMixin:
+    """Поиск в списке объектов по индексу FTS5 вместо LIKE '%term%'."""
+
+    def get_search_results(self, request, queryset, search_term):
+        return filter_by_text(queryset, search_term), False
 
 
 @admin.register(Group)
@@ -18,7 +26,7 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -33,7 +41,7 @@ class PostAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -42,6 +50,7 @@ class CommentAdmin(admin.ModelAdmin):
     )
     search_fields = ('text',)
     list_filter = ('created',)
+    raw_id_fields = ('parent',)
     empty_value_display = EMPTY_VALUE_DISPLAY
 
 
@@ -0,0 +1,82 @@
+"""Условные GET-запросы (ETag) для анонимных посетителей.
+
+Валидатор страницы вычисляется без загрузки её объектов: для лент это
+поколение кэша лент (`feed_cache`), которое меняется при любом изменении
+постов, групп и авторов, для профиля и поста к нему добавляются счётчики
+подписок и комментариев. При совпадении с If-None-Match view не
+вызывается и отдаётся 304. Страницы вошедших пользователей содержат
+персональные данные и всегда отрисовываются заново.
+
+Поколение кэша лент переживает выкладку, поэтому в ETag входит и версия
+кода (`etag_version`): после смены шаблонов клиенты получат новую
+страницу, а не 304.
+"""
+import hashlib
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Max
+from django.views.decorators.http import condition
+
+from .feed_cache import feed_generation
+from .models import AuthorStats, Post
+
+
+def anonymous_condition(etag_func):
+    def etag(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        return etag_func(request, *args, **kwargs)
+    return condition(etag_func=etag)
+
+
+@lru_cache(maxsize=None)
+def _source_digest():
+    digest = hashlib.md5()
+    for root, dirs, files in os.walk(settings.BASE_DIR):
+        dirs[:] = sorted(
+            name for name in dirs
+            if not name.startswith(('.', '__'))
+            and os.path.join(root, name) != settings.MEDIA_ROOT
+        )
+        for name in sorted(files):
+            if name.endswith(('.py', '.html')) or name == 'staticfiles.json':
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, settings.BASE_DIR)
+                digest.update(relative.encode())
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+    return digest.hexdigest()[:12]
+
+
+def etag_version():
+    """Версия кода для ETag: ETAG_VERSION или хеш исходников."""
+    return settings.ETAG_VERSION or _source_digest()
+
+
+def feed_etag(request, *args, **kwargs):
+    return f'feed-{etag_version()}-{feed_generation()}'
+
+
+def profile_etag(request, username):
+    counters = AuthorStats.objects.filter(
+        user__username=username
+    ).values_list('followers_count', 'following_count').first()
+    if counters is None:
+        return None
+    followers, following = counters
+    return (
+        f'profile-{etag_version()}-{feed_generation()}-'
+        f'{followers}-{following}'
+    )
+
+
+def post_etag(request, post_id):
+    comments = Post.objects.filter(pk=post_id).annotate(
+        last_comment=Max('comments__pk')
+    ).values_list('comments_count', 'last_comment').first()
+    if comments is None:
+        return None
+    count, last = comments
+    return f'post-{etag_version()}-{feed_generation()}-{count}-{last}'
@@ -0,0 +1,117 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики меняются сигналами в той же транзакции, что и сами объекты,
+поэтому страницы профиля и поста не выполняют агрегирующих запросов.
+Расхождения исправляет команда `recount_counters`.
+"""
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def _counts(queryset, field):
+    return dict(
+        queryset.order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values_list(field, 'count')
+    )
+
+
+def user_counts(user_ids=None):
+    """Настоящие значения счётчиков пользователей."""
+    posts, follows = Post.objects.all(), Follow.objects.all()
+    if user_ids is not None:
+        posts = posts.filter(author__in=user_ids)
+        follows = follows.filter(author__in=user_ids)
+        following = Follow.objects.filter(user__in=user_ids)
+    else:
+        following = Follow.objects.all()
+    return {
+        'posts_count': _counts(posts, 'author'),
+        'followers_count': _counts(follows, 'author'),
+        'following_count': _counts(following, 'user'),
+    }
+
+
+def recount_user(user_id):
+    """Пересчитывает счётчики одного пользователя."""
+    counts = user_counts([user_id])
+    AuthorStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            field: counts[field].get(user_id, 0) for field in STATS_FIELDS
+        },
+    )
+
+
+def _add(queryset, field, delta):
+    # Счётчик не уходит в минус, даже если успел разойтись с данными.
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change(user_id, field, delta):
+    """Изменяет счётчик пользователя на `delta`."""
+    updated = _add(AuthorStats.objects.filter(user_id=user_id), field, delta)
+    if not updated and delta > 0:
+        recount_user(user_id)
+
+
+def change_comments(post_id, delta):
+    _add(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def change_replies(comment, delta):
+    """Меняет число ответов у всех предков комментария."""
+    ancestors = comment.ancestor_ids()
+    if ancestors:
+        _add(Comment.objects.filter(pk__in=ancestors), 'replies_count', delta)
+
+
+def recount_all():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    counts = user_counts()
+    existing = AuthorStats.objects.in_bulk()
+    fixed = 0
+    user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+    user_ids = user_ids.iterator()
+    while True:
+        batch = list(islice(user_ids, BATCH_SIZE))
+        if not batch:
+            break
+        to_create, to_update = [], []
+        for user_id in batch:
+            values = {
+                field: counts[field].get(user_id, 0)
+                for field in STATS_FIELDS
+            }
+            stats = existing.get(user_id)
+            if stats is None:
+                to_create.append(AuthorStats(user_id=user_id, **values))
+            elif any(getattr(stats, f) != v for f, v in values.items()):
+                for field, value in values.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+        AuthorStats.objects.bulk_create(to_create)
+        AuthorStats.objects.bulk_update(to_update, STATS_FIELDS)
+        fixed += len(to_create) + len(to_update)
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(count=Count('pk')).values('count')
+    actual = Coalesce(Subquery(comments), Value(0))
+    fixed += Post.objects.annotate(actual=actual).exclude(
+        comments_count=F('actual')
+    ).count()
+    Post.objects.update(comments_count=actual)
+    return fixed
@@ -0,0 +1,40 @@
+"""Поколения кэша лент.
+
+Любое изменение поста, группы или автора увеличивает счётчик поколения.
+Счётчик входит в ключи кэшированных страниц и фрагментов лент, поэтому
+после изменения старые записи просто перестают читаться и вытесняются
+сами.
+"""
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'feed:generation'
+
+
+def _initial_generation():
+    # Если счётчик вытеснен из кэша, он не должен начаться заново с
+    # уже использованного значения, иначе оживут устаревшие записи.
+    return int(time.time() * 1000)
+
+
+def feed_generation():
+    """Текущее поколение лент."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _initial_generation(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_feed_generation():
+    """Делает недействительными все кэшированные ленты."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, _initial_generation(), None)
+
+
+def feed_key(name):
+    """Префикс ключей кэша ленты name в текущем поколении."""
+    return f'feed:{name}:{feed_generation()}'
@@ -0,0 +1,85 @@
+"""Кэш подписок пользователя.
+
+Для каждого пользователя в кэше лежит отсортированный массив id авторов,
+на которых он подписан (`array('l')`, 8 байт на подписку). Массив
+загружается из Follow одним запросом при первом обращении и сбрасывается
+сигналами Follow, поэтому «подписан ли он на автора» — это двоичный поиск
+в готовом массиве без запросов к базе.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+
+def cache_key(user_id):
+    return f'following:{user_id}'
+
+
+def load(user_id):
+    """Отсортированный массив id авторов прямо из базы."""
+    # Сортируем здесь: ORDER BY потребовал бы отдельной сортировки в
+    # базе поверх индекса по user_id.
+    return array('l', sorted(Follow.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True)))
+
+
+def following_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан пользователь."""
+    key = cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = load(user_id)
+        cache.set(key, ids, settings.FOLLOW_CACHE_TIMEOUT)
+    return ids
+
+
+def invalidate(user_id):
+    """Сбрасывает кэш подписок пользователя."""
+    key = cache_key(user_id)
+    cache.delete(key)
+    # Параллельный запрос мог успеть положить в кэш состояние до
+    # фиксации транзакции, поэтому после неё сбрасываем ещё раз.
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class FollowingSet:
+    """Подписки пользователя, загружаемые при первой проверке."""
+
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+        self._ids = None if user_id is not None else array('l')
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = following_ids(self.user_id)
+        return self._ids
+
+    def __contains__(self, author_id):
+        ids = self.ids
+        index = bisect_left(ids, author_id)
+        return index < len(ids) and ids[index] == author_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def following(user):
+    """Подписки пользователя, общие для всего запроса.
+
+    Для анонимного пользователя — пустое множество.
+    """
+    if not user.is_authenticated:
+        return FollowingSet()
+    if getattr(user, '_following', None) is None:
+        user._following = FollowingSet(user.pk)
+    return user._following
@@ -0,0 +1,98 @@
+"""Учёт ссылок на файлы картинок постов.
+
+Картинки лежат в `core.storage.ContentAddressedStorage`, и один файл может
+принадлежать многим постам. Сигналы увеличивают и уменьшают `refcount`
+в той же транзакции, что и сам пост, а файлы без ссылок удаляет вместе
+с миниатюрами команда `collect_images`. Удаляются только файлы, которые
+не менялись и не загружались повторно дольше отсрочки: так сборка мусора
+не мешает загрузке, пост которой ещё не сохранён.
+"""
+import posixpath
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import ImageBlob, Post
+
+GRACE_PERIOD = timedelta(days=1)
+
+
+def image_name(value):
+    """Имя сохранённого файла из значения поля или None."""
+    return getattr(value, 'name', value) or None
+
+
+def acquire(name):
+    if not name:
+        return
+    now = timezone.now()
+    updated = ImageBlob.objects.filter(name=name).update(
+        refcount=F('refcount') + 1, updated=now
+    )
+    if not updated:
+        ImageBlob.objects.bulk_create(
+            [ImageBlob(name=name, refcount=0, updated=now)],
+            ignore_conflicts=True,
+        )
+        ImageBlob.objects.filter(name=name).update(
+            refcount=F('refcount') + 1
+        )
+
+
+def release(name):
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1, updated=timezone.now()
+    )
+
+
+def _candidates(storage, directory, cutoff):
+    unused = set(
+        ImageBlob.objects.filter(refcount=0, updated__lt=cutoff)
+        .values_list('name', flat=True)
+    )
+    if not storage.exists(directory):
+        return sorted(unused)
+    files = {
+        posixpath.join(directory, filename)
+        for filename in storage.listdir(directory)[1]
+    }
+    known = set(
+        ImageBlob.objects.filter(name__in=files)
+        .values_list('name', flat=True)
+    )
+    return sorted(unused | (files - known))
+
+
+def collect(grace=GRACE_PERIOD, dry_run=False):
+    """Удаляет файлы картинок без ссылок и возвращает их имена."""
+    field = Post._meta.get_field('image')
+    storage, directory = field.storage, field.upload_to.rstrip('/')
+    cutoff = timezone.now() - grace
+    deleted = []
+    for name in _candidates(storage, directory, cutoff):
+        with transaction.atomic():
+            # Пустой UPDATE блокирует строку (в SQLite — базу на запись) до
+            # конца транзакции, так что acquire() повторной загрузки ждёт,
+            # а обе проверки ниже делаются прямо перед удалением.
+            blob = ImageBlob.objects.filter(name=name)
+            blob.update(refcount=F('refcount'))
+            in_use = Q(refcount__gt=0) | Q(updated__gte=cutoff)
+            if blob.filter(in_use).exists():
+                continue
+            if (storage.exists(name)
+                    and storage.get_modified_time(name) >= cutoff):
+                continue
+            if not dry_run:
+                blob.delete()
+                default.kvstore.delete(
+                    ImageFile(name, storage), delete_thumbnails=True
+                )
+                storage.delete(name)
+        deleted.append(name)
+    return deleted
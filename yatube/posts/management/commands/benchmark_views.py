@@ -0,0 +1,196 @@
+import json
+import math
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class QueryCounter:
+    """Считает запросы и их время без ограничения CaptureQueriesContext."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число запросов и пик памяти основных страниц '
+        'через тестовый клиент и сохраняет отчёт в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--budget', type=float, default=60,
+            help='Предел времени замеров одной страницы, секунд; '
+                 'медленная страница замеряется меньшее число раз.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument('--output', default='benchmark.json')
+
+    def targets(self):
+        """Адреса страниц на самых «тяжёлых» объектах базы."""
+        author = User.objects.annotate(
+            count=Count('posts')
+        ).order_by('-count').first()
+        reader = Follow.objects.values('user').annotate(
+            count=Count('pk')
+        ).order_by('-count').first()
+        group = Group.objects.annotate(
+            count=Count('posts')
+        ).order_by('-count').first()
+        post = Post.objects.order_by('-comments_count', '-pk').first()
+        if not (author and reader and group and post):
+            raise CommandError(
+                'Недостаточно данных, сначала выполните generate_data.'
+            )
+        return {
+            'index': (reverse('posts:index'), None),
+            'group_posts': (
+                reverse('posts:group_list', args=[group.slug]), None
+            ),
+            'profile': (
+                reverse('posts:profile', args=[author.username]), None
+            ),
+            'post_detail': (
+                reverse('posts:post_detail', args=[post.pk]), None
+            ),
+            'follow_index': (reverse('posts:follow_index'), reader['user']),
+            'api_posts': (reverse('api:posts'), None),
+            'api_comments': (
+                reverse('api:comments', args=[post.pk]), None
+            ),
+        }
+
+    def request(self, client, url, cold):
+        if cold:
+            cache.clear()
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+        return response
+
+    def measure(self, url, user_id, options):
+        client = Client()
+        if user_id is not None:
+            client.force_login(User.objects.get(pk=user_id))
+        cold = options['cold']
+        deadline = time.perf_counter() + options['budget']
+        for _ in range(options['warmup']):
+            if time.perf_counter() > deadline:
+                break
+            self.request(client, url, cold)
+        timings = []
+        while len(timings) < options['requests']:
+            if timings and time.perf_counter() > deadline:
+                break
+            queries = QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(queries):
+                self.request(client, url, cold)
+            timings.append((time.perf_counter() - started) * 1000)
+        # Пик памяти замеряется отдельным запросом: tracemalloc сам по
+        # себе сильно замедляет обработку.
+        tracemalloc.start()
+        try:
+            self.request(client, url, cold)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        timings.sort()
+        return {
+            'url': url,
+            'requests': len(timings),
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': queries.count,
+            'queries_ms': round(queries.seconds * 1000, 3),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть больше нуля.')
+        # Тестовый клиент обращается к хосту testserver.
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts):
+            views = {}
+            for name, (url, user_id) in self.targets().items():
+                try:
+                    views[name] = self.measure(url, user_id, options)
+                except Exception as error:
+                    # Упавшая страница попадает в отчёт, остальные
+                    # продолжают замеряться.
+                    views[name] = {'url': url, 'error': repr(error)}
+        report = {
+            'created': timezone.now().isoformat(),
+            'revision': git_revision(),
+            'cold_cache': options['cold'],
+            'data': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'views': views,
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        for name, result in views.items():
+            if 'error' in result:
+                self.stdout.write(f'{name:<13} ошибка: {result["error"]}')
+                continue
+            self.stdout.write(
+                f'{name:<13} p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'p99 {result["p99_ms"]:8.2f} мс  '
+                f'запросов {result["queries"]:5}  '
+                f'память {result["peak_memory_kb"]:8.1f} КБ'
+            )
+        self.stdout.write(f'Отчёт: {options["output"]}')
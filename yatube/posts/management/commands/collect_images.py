@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from posts.images import GRACE_PERIOD, collect
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы картинок, на которые не ссылается ни один пост.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float,
+            default=GRACE_PERIOD.total_seconds() / 3600,
+            help='Не трогать файлы, изменённые за это число часов.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        deleted = collect(
+            grace=timedelta(hours=options['grace_hours']),
+            dry_run=options['dry_run'],
+        )
+        for name in deleted:
+            self.stdout.write(name)
+        label = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'{label} файлов: {len(deleted)}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «на кого подписаться».'
+
+    def handle(self, *args, **options):
+        users, suggestions = rebuild()
+        self.stdout.write(
+            f'Пользователей: {users}, рекомендаций: {suggestions}'
+        )
@@ -0,0 +1,203 @@
+import itertools
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import counters, timeline
+from posts.feed_cache import bump_feed_generation
+from posts.models import Comment, Follow, Group, Post, root_comment_path
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+WORDS = (
+    'утро', 'город', 'море', 'книга', 'кофе', 'прогулка', 'снег', 'лето',
+    'поезд', 'музыка', 'работа', 'друзья', 'кино', 'парк', 'дождь',
+    'солнце', 'дорога', 'вечер', 'идея', 'проект', 'кошка', 'сад',
+)
+
+
+def power_law(count, exponent, rng):
+    """Накопленные веса закона Ципфа для случайно перемешанных рангов."""
+    weights = [1 / rank ** exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+@contextmanager
+def explicit_dates(model, field):
+    # bulk_create иначе проставит всем объектам одно и то же «сейчас».
+    date_field = model._meta.get_field(field)
+    date_field.auto_now_add = False
+    try:
+        yield
+    finally:
+        date_field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетических пользователей, группы, посты, комментарии '
+        'и подписки для проверки производительности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного закона активности авторов.',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='synthetic')
+
+    def bulk_create(self, model, objects):
+        objects = iter(objects)
+        while True:
+            batch = list(itertools.islice(objects, BATCH_SIZE))
+            if not batch:
+                return
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def dates(self, count, days, rng):
+        now = timezone.now()
+        seconds = days * 24 * 60 * 60
+        offsets = sorted(
+            (rng.uniform(0, seconds) for _ in range(count)), reverse=True
+        )
+        return [now - timedelta(seconds=offset) for offset in offsets]
+
+    def text(self, rng, low, high):
+        return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+    def create_users(self, options):
+        prefix, count = options['prefix'], options['users']
+        start = User.objects.filter(username__startswith=prefix).count()
+        self.bulk_create(User, (
+            User(
+                username=f'{prefix}{number}',
+                first_name='Имя',
+                last_name=f'Фамилия{number}',
+                password='!',
+            )
+            for number in range(start, start + count)
+        ))
+        return list(
+            User.objects.filter(username__startswith=prefix)
+            .order_by('-pk').values_list('pk', flat=True)[:count]
+        )
+
+    def create_groups(self, options):
+        prefix = options['prefix']
+        start = Group.objects.filter(slug__startswith=prefix).count()
+        self.bulk_create(Group, (
+            Group(
+                title=f'Группа {number}',
+                slug=f'{prefix}-{number}',
+                description='Синтетическая группа',
+            )
+            for number in range(start, start + options['groups'])
+        ))
+        return list(
+            Group.objects.filter(slug__startswith=prefix)
+            .values_list('pk', flat=True)
+        )
+
+    def create_posts(self, options, users, groups, rng):
+        authors = power_law(len(users), options['exponent'], rng)
+        dates = self.dates(options['posts'], options['days'], rng)
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        with explicit_dates(Post, 'pub_date'):
+            self.bulk_create(Post, (
+                Post(
+                    author_id=rng.choices(users, cum_weights=authors)[0],
+                    group_id=(
+                        rng.choice(groups)
+                        if groups and rng.random() < 0.7 else None
+                    ),
+                    text=self.text(rng, 5, 60),
+                    pub_date=date,
+                )
+                for date in dates
+            ))
+        return list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'pub_date')
+        )
+
+    def create_comments(self, options, users, posts, rng):
+        if not posts:
+            return 0
+        popularity = power_law(len(posts), options['exponent'], rng)
+        authors = power_law(len(users), options['exponent'], rng)
+        now = timezone.now()
+        with explicit_dates(Comment, 'created'):
+            self.bulk_create(Comment, (
+                Comment(
+                    post_id=post_id,
+                    author_id=rng.choices(users, cum_weights=authors)[0],
+                    text=self.text(rng, 2, 20),
+                    created=min(
+                        pub_date + timedelta(minutes=rng.expovariate(1 / 600)),
+                        now,
+                    ),
+                )
+                for post_id, pub_date in (
+                    rng.choices(posts, cum_weights=popularity)[0]
+                    for _ in range(options['comments'])
+                )
+            ))
+        # Comment.save не вызывался: путь в ветке задаётся одним запросом.
+        Comment.objects.filter(path='').update(path=root_comment_path())
+        return options['comments']
+
+    def create_follows(self, options, users, rng):
+        # Популярных авторов читают чаще: цели выбираются по тому же
+        # степенному закону, число подписок — по распределению Парето.
+        targets = power_law(len(users), options['exponent'], rng)
+        scale = options['follows'] / 3
+        pairs = set()
+        for user_id in users:
+            count = min(int(rng.paretovariate(1.5) * scale), len(users) - 1)
+            for author_id in rng.choices(users, cum_weights=targets, k=count):
+                if author_id != user_id:
+                    pairs.add((user_id, author_id))
+        self.bulk_create(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ))
+        return {user_id for user_id, _ in pairs}
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users = self.create_users(options)
+            groups = self.create_groups(options)
+            posts = self.create_posts(options, users, groups, rng)
+            comments = self.create_comments(options, users, posts, rng)
+            followers = self.create_follows(options, users, rng)
+            # bulk_create не отправляет сигналы: производные данные
+            # пересчитываются целиком.
+            counters.recount_all()
+            for user_id in followers:
+                timeline.rebuild(user_id)
+        bump_feed_generation()
+        self.stdout.write(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'постов {len(posts)}, комментариев {comments}, '
+            f'подписчиков {len(followers)}'
+        )
@@ -0,0 +1,112 @@
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+SYLLABLES = (
+    'ба', 'ве', 'ги', 'до', 'жу', 'за', 'ки', 'ло', 'ми', 'ну',
+    'по', 'ра', 'се', 'ти', 'фу', 'ха', 'це', 'чи', 'ша', 'ют',
+)
+SCHEMA = (
+    'CREATE TABLE posts (id INTEGER PRIMARY KEY, text TEXT NOT NULL)',
+    "CREATE VIRTUAL TABLE posts_fts USING fts5("
+    " text, content='posts', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+)
+QUERIES = {
+    'LIKE': {
+        'страница': 'SELECT id FROM posts WHERE text LIKE ? '
+                    'ORDER BY id DESC LIMIT 10',
+        'COUNT': 'SELECT COUNT(*) FROM posts WHERE text LIKE ?',
+    },
+    'FTS5': {
+        'страница': 'SELECT posts.id FROM posts '
+                    'JOIN posts_fts ON posts_fts.rowid = posts.id '
+                    'WHERE posts_fts.text MATCH ? '
+                    'ORDER BY posts_fts.rank, posts.id LIMIT 10',
+        'COUNT': 'SELECT COUNT(*) FROM posts_fts WHERE posts_fts MATCH ?',
+    },
+}
+# Частое, среднее и редкое слово по закону Ципфа.
+TERM_RANKS = (1, 100, 5000)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск FTS5 и LIKE на синтетических постах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def vocabulary(self, size, rng):
+        words = set()
+        while len(words) < size:
+            length = rng.randint(2, 4)
+            words.add(''.join(rng.choice(SYLLABLES) for _ in range(length)))
+        return sorted(words, key=lambda word: rng.random())
+
+    def texts(self, count, words, rng):
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(words) + 1)
+        ))
+        for _ in range(count):
+            length = rng.randint(5, 40)
+            text = rng.choices(words, cum_weights=weights, k=length)
+            yield (' '.join(text),)
+
+    def measure(self, connection, sql, parameter, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            connection.execute(sql, (parameter,)).fetchall()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = self.vocabulary(options['words'], rng)
+        with tempfile.TemporaryDirectory() as directory:
+            connection = sqlite3.connect(
+                os.path.join(directory, 'search.sqlite3')
+            )
+            for statement in SCHEMA:
+                connection.execute(statement)
+            started = time.perf_counter()
+            with connection:
+                connection.executemany(
+                    'INSERT INTO posts (text) VALUES (?)',
+                    self.texts(options['posts'], words, rng),
+                )
+            loaded = time.perf_counter()
+            with connection:
+                connection.execute(
+                    "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"
+                )
+            self.stdout.write(
+                f'Постов: {options["posts"]}, загрузка '
+                f'{loaded - started:.1f} с, построение индекса '
+                f'{time.perf_counter() - loaded:.1f} с'
+            )
+            for rank in TERM_RANKS:
+                term = words[rank - 1]
+                parameters = {'LIKE': f'%{term}%', 'FTS5': f'"{term}"'}
+                for method, queries in QUERIES.items():
+                    results = []
+                    for name, sql in queries.items():
+                        elapsed = self.measure(
+                            connection, sql, parameters[method],
+                            options['repeat'],
+                        )
+                        results.append(f'{name} {elapsed:.2f} мс')
+                    self.stdout.write(
+                        f'«{term}» (ранг {rank}) {method}: '
+                        + ', '.join(results)
+                    )
+            connection.close()
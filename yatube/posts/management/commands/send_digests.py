@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Отправляет подписчикам дайджесты новых постов.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        emails, delivered = send_digests()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Писем: {emails}, событий: {delivered}, {elapsed:.2f} с, '
+            f'{emails / elapsed if elapsed else 0:.0f} писем/с'
+        )
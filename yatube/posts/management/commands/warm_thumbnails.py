@@ -0,0 +1,97 @@
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+CHECKPOINT = os.path.join(settings.BASE_DIR, '.warm_thumbnails.json')
+
+
+def _warm(name):
+    try:
+        return name, thumbnails.warm(name), None
+    except Exception as error:
+        return name, 0, repr(error)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры картинок постов и заполняет '
+        'хранилище ключей sorl.thumbnail.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--checkpoint', default=CHECKPOINT)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с первого поста, не читая контрольную точку.',
+        )
+
+    def load_checkpoint(self, path):
+        try:
+            with open(path) as file:
+                return json.load(file)['last_pk']
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def save_checkpoint(self, path, last_pk):
+        with open(path + '.tmp', 'w') as file:
+            json.dump({'last_pk': last_pk}, file)
+        os.replace(path + '.tmp', path)
+
+    def handle(self, *args, **options):
+        path = options['checkpoint']
+        last_pk = 0 if options['restart'] else self.load_checkpoint(path)
+        if last_pk:
+            self.stdout.write(f'Продолжение после поста {last_pk}')
+        posts = Post.objects.exclude(image='').order_by('pk')
+        stats = Counter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            mapper = map
+            if options['workers'] > 1:
+                # Дочерним процессам не нужны соединения родителя с базой.
+                connections.close_all()
+                pool = stack.enter_context(ProcessPoolExecutor(
+                    options['workers'], initializer=django.setup
+                ))
+                mapper = pool.map
+            while True:
+                batch = list(
+                    posts.filter(pk__gt=last_pk)
+                    .values_list('pk', 'image')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                names = [image for _, image in batch]
+                for name, created, error in mapper(_warm, names):
+                    if error:
+                        stats['failed'] += 1
+                        self.stderr.write(f'{name}: {error}')
+                    elif created:
+                        stats['created'] += 1
+                    else:
+                        stats['skipped'] += 1
+                last_pk = batch[-1][0]
+                self.save_checkpoint(path, last_pk)
+        if os.path.exists(path):
+            os.remove(path)
+        elapsed = time.perf_counter() - started
+        total = sum(stats.values())
+        self.stdout.write(
+            f'Обработано картинок: {total} за {elapsed:.1f} с '
+            f'({total / elapsed:.1f} в секунду)\n'
+            f'Создано: {stats["created"]}, пропущено: {stats["skipped"]}, '
+            f'ошибок: {stats["failed"]}'
+        )
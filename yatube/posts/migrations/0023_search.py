@@ -0,0 +1,85 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+
+# Внешнее содержимое: индекс хранит только токены, тексты остаются
+# в таблицах моделей. Триггеры обновляют индекс при любом изменении,
+# включая bulk_create, update() и удаление каскадом.
+INDEXES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+CREATE = (
+    """CREATE VIRTUAL TABLE {index} USING fts5(
+        text, content='{table}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {index}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {index}({index}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER {index}_update AFTER UPDATE OF text ON {table} BEGIN
+        INSERT INTO {index}({index}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {index}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    "INSERT INTO {index}({index}) VALUES ('rebuild')",
+)
+DROP = (
+    'DROP TRIGGER IF EXISTS {index}_insert',
+    'DROP TRIGGER IF EXISTS {index}_delete',
+    'DROP TRIGGER IF EXISTS {index}_update',
+    'DROP TABLE IF EXISTS {index}',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for index, table in INDEXES:
+            for statement in statements:
+                schema_editor.execute(
+                    statement.format(index=index, table=table)
+                )
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_imageblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentIndex',
+            fields=[
+                ('comment', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='posts.Comment')),
+                ('text', posts.models.SearchField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_comment_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PostIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='posts.Post')),
+                ('text', posts.models.SearchField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
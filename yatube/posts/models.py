@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F, Lookup, Value
+from django.db.models.functions import Cast, LPad
+
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -17,6 +22,26 @@ class Group(models.Model):
         return f'{self.title}'
 
 
+class PostQuerySet(models.QuerySet):
+    # Поля, которые выводит карточка поста в лентах.
+    FEED_FIELDS = (
+        'text',
+        'pub_date',
+        'image',
+        'author',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group',
+        'group__slug',
+        'group__title',
+    )
+
+    def feed(self):
+        """Посты для ленты: автор и группа загружаются тем же запросом."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -44,19 +69,60 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+# Ширина одного звена пути комментария (Comment.path).
+PATH_STEP = 10
+ROOT_KEY = 10 ** PATH_STEP - 1
+
+
+def root_comment_path():
+    """Выражение пути комментария верхнего уровня для update()."""
+    return LPad(
+        Cast(Value(ROOT_KEY) - F('pk'), models.CharField()),
+        PATH_STEP,
+        Value('0'),
+    )
+
+
 class Comment(models.Model):
+    """Комментарий; ответы образуют ветки.
+
+    `path` — материализованный путь: звенья из pk предков и самого
+    комментария по PATH_STEP цифр. Звено верхнего уровня хранится как
+    ROOT_KEY - pk, поэтому сортировка по path выводит сначала новые
+    ветки, а внутри ветки ответы идут по порядку под своим родителем.
+    Ветка или её часть выбирается одним запросом по диапазону path.
+    """
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -76,15 +142,83 @@ class Comment(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies',
+        verbose_name='Ответ на комментарий'
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=255,
+        default='',
+        editable=False
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Уровень вложенности',
+        default=0,
+        editable=False
+    )
+    replies_count = models.PositiveIntegerField(
+        'Число ответов во всей ветке',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'),
+            models.Index(
+                fields=['post', 'path'],
+                name='comment_post_path_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.parent_id:
+            parent = self.parent
+            if parent.depth >= settings.COMMENT_MAX_DEPTH:
+                # Ответ глубже предела становится соседом родителя.
+                self.parent = parent = parent.parent
+            self.depth = parent.depth + 1
+        super().save(*args, **kwargs)
+        if not self.path:
+            if self.parent_id:
+                self.path = f'{self.parent.path}{self.pk:0{PATH_STEP}d}'
+            else:
+                self.path = f'{ROOT_KEY - self.pk:0{PATH_STEP}d}'
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    def ancestor_ids(self):
+        """pk всех предков: звенья пути родителя."""
+        if not self.parent_id:
+            return []
+        # Сигнал post_save приходит до записи собственного пути.
+        path = self.path[:-PATH_STEP] if self.path else self.parent.path
+        steps = [
+            int(path[start:start + PATH_STEP])
+            for start in range(0, len(path), PATH_STEP)
+        ]
+        steps[0] = ROOT_KEY - steps[0]
+        return steps
+
+    def subtree(self):
+        """Все ответы ветки в порядке вывода."""
+        return Comment.objects.filter(
+            post_id=self.post_id,
+            path__gt=self.path,
+            path__lt=self.path + '~',
+        ).order_by('path')
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -107,3 +241,180 @@ class Follow(models.Model):
 
     def __str__(self):
         return self.user
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+    def __str__(self):
+        return f'{self.user_id}'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry')
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class Notification(models.Model):
+    """Событие «новый пост автора» для подписчика, ждущее дайджеста."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+    )
+    created = models.DateTimeField('Создано', db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_notification')
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class Suggestion(models.Model):
+    """Рекомендация «на кого подписаться», пересчитывается командой."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ('-score',)
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='suggestion_user_score_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_suggestion')
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.author_id}'
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются."""
+    name = models.CharField('Имя файла', max_length=100, primary_key=True)
+    refcount = models.PositiveIntegerField('Число ссылок', default=0)
+    updated = models.DateTimeField('Изменено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+        indexes = [
+            models.Index(
+                fields=['refcount', 'updated'],
+                name='imageblob_refcount_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class SearchField(models.TextField):
+    """Колонка полнотекстового индекса FTS5."""
+
+
+@SearchField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostIndex(models.Model):
+    """Полнотекстовый индекс текстов постов (таблица FTS5)."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_index',
+    )
+    text = SearchField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+
+
+class CommentIndex(models.Model):
+    """Полнотекстовый индекс текстов комментариев (таблица FTS5)."""
+    comment = models.OneToOneField(
+        Comment,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_index',
+    )
+    text = SearchField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_comment_fts'
@@ -0,0 +1,153 @@
+"""Дайджесты новых постов для подписчиков.
+
+Новый пост не отправляет писем сам: фоновое задание `notify_followers`
+записывает событие Notification на каждого подписчика с адресом почты.
+Команда `send_digests` собирает события пользователя в одно письмо, когда
+самому старому из них исполнится `DIGEST_WINDOW` секунд, и отправляет
+письма пачками по `DIGEST_BATCH_SIZE` пользователей через одно
+соединение с почтовым сервером. События пользователя удаляются сразу
+после того, как сервер принял его письмо. Если письмо не отправилось,
+ошибка записывается в журнал, события этого пользователя остаются до
+следующего запуска, а отправка остальным продолжается; уже отправленные
+письма не повторятся.
+"""
+import logging
+import time
+from contextlib import suppress
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Count, Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.metrics import REGISTRY
+
+from .models import Follow, Notification
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def notify_followers(post):
+    """Ставит событие о посте всем подписчикам автора с адресом почты."""
+    now = timezone.now()
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).exclude(user__email='').values_list('user_id', flat=True).iterator()
+    while True:
+        batch = list(islice(followers, BATCH_SIZE))
+        if not batch:
+            return
+        Notification.objects.bulk_create(
+            (
+                Notification(user_id=user_id, post=post, created=now)
+                for user_id in batch
+            ),
+            ignore_conflicts=True,
+        )
+
+
+def due_users(cutoff):
+    """Пользователи, у которых есть события старше cutoff."""
+    return list(
+        Notification.objects.filter(created__lte=cutoff)
+        .order_by().values_list('user_id', flat=True).distinct()
+    )
+
+
+def digest_message(user, notifications, total):
+    """Письмо с постами notifications из total новых."""
+    posts = [notification.post for notification in notifications]
+    context = {
+        'user': user,
+        'posts': posts,
+        'more': total - len(posts),
+        'site_url': settings.SITE_URL,
+    }
+    return EmailMessage(
+        f'Новые посты авторов, на которых вы подписаны: {total}',
+        render_to_string('posts/email/digest.txt', context),
+        to=[user.email],
+    )
+
+
+def _deliver(connection, user_id, total, last_pk):
+    """Отправляет дайджест и удаляет его события, если письмо принято.
+
+    Загружаются только `DIGEST_MAX_POSTS` событий для письма, остальные
+    удаляются по диапазону pk.
+    """
+    pending = Notification.objects.filter(user_id=user_id, pk__lte=last_pk)
+    shown = list(pending.select_related(
+        'user', 'post__author'
+    ).order_by('-pk')[:settings.DIGEST_MAX_POSTS])
+    if not shown:
+        return 0
+    message = digest_message(shown[0].user, shown, total)
+    if not connection.send_messages([message]):
+        return 0
+    return pending.delete()[0]
+
+
+def _send_batch(connection, user_ids, last_pk):
+    pending = Notification.objects.filter(
+        user_id__in=user_ids, pk__lte=last_pk
+    ).order_by('user_id').values('user_id').annotate(
+        total=Count('pk'), last=Max('pk')
+    )
+    sent = delivered = failed = 0
+    for row in pending:
+        try:
+            count = _deliver(
+                connection, row['user_id'], row['total'], row['last']
+            )
+        except Exception:
+            logger.exception(
+                'Не удалось отправить дайджест пользователю %s',
+                row['user_id'],
+            )
+            failed += 1
+            # Соединение могло оборваться: следующее письмо откроет новое.
+            with suppress(Exception):
+                connection.close()
+            continue
+        sent += bool(count)
+        delivered += count
+    REGISTRY.inc('yatube_digest_emails_total', (), sent)
+    REGISTRY.inc('yatube_digest_notifications_total', (), delivered)
+    REGISTRY.inc('yatube_digest_failures_total', (), failed)
+    return sent, delivered
+
+
+def send_digests(cutoff=None):
+    """Отправляет созревшие дайджесты.
+
+    Возвращает число писем и число доставленных событий.
+    """
+    if cutoff is None:
+        cutoff = timezone.now() - timedelta(seconds=settings.DIGEST_WINDOW)
+    # События, пришедшие во время отправки, подождут следующего запуска.
+    last_pk = Notification.objects.aggregate(last=Max('pk'))['last']
+    if last_pk is None:
+        return 0, 0
+    user_ids = iter(due_users(cutoff))
+    emails = delivered = 0
+    with get_connection() as connection:
+        while True:
+            batch = list(islice(user_ids, settings.DIGEST_BATCH_SIZE))
+            if not batch:
+                break
+            started = time.perf_counter()
+            sent, count = _send_batch(connection, batch, last_pk)
+            REGISTRY.observe(
+                'yatube_digest_batch_duration_seconds', (),
+                time.perf_counter() - started,
+            )
+            emails += sent
+            delivered += count
+    REGISTRY.flush()
+    return emails, delivered
@@ -0,0 +1,57 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Тексты индексируются в таблицах FTS5 `posts_post_fts` и
+`posts_comment_fts` (см. миграцию 0023_search), которые триггеры
+обновляют вместе с исходными таблицами. Результаты упорядочены по
+релевансу bm25 (`rank`, меньше — лучше) и pk, поэтому их можно листать
+курсорами `core.paginator` так же, как ленты.
+"""
+import re
+
+from django.db.models import F
+
+from .models import Comment, Post
+
+MAX_TERMS = 10
+WORD = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """Запрос FTS5 из строки пользователя или None, если искать нечего.
+
+    Слова экранируются кавычками, поэтому операторы FTS5 во вводе не
+    работают; каждое слово ищется как префикс, а все слова обязательны.
+    """
+    words = WORD.findall(query.lower())[:MAX_TERMS]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _ranked(queryset, query):
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(
+        search_index__text__match=expression
+    ).annotate(
+        search_rank=F('search_index__rank')
+    ).order_by('search_rank', 'pk')
+
+
+def search_posts(query):
+    return _ranked(Post.objects.feed(), query)
+
+
+def search_comments(query):
+    return _ranked(
+        Comment.objects.select_related('author'), query
+    )
+
+
+def filter_by_text(queryset, query):
+    """Оставляет в queryset постов или комментариев совпадения с query."""
+    expression = match_expression(query)
+    if expression is None:
+        return queryset
+    return queryset.filter(search_index__text__match=expression)
@@ -0,0 +1,163 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, follow_cache, images, tasks, thumbnails, timeline
+from .feed_cache import bump_feed_generation
+from .models import AuthorStats, Comment, Follow, Group, Post, Suggestion
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw, **kwargs):
+    """Раскладывает новый пост по лентам подписчиков в фоне."""
+    if created and not raw:
+        tasks.fan_out_post.delay(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def notify_followers(sender, instance, created, raw, **kwargs):
+    """Готовит подписчикам события для дайджестов в фоне.
+
+    Задание ставится после фиксации: обход подписчиков не выполняется
+    внутри транзакции post_create даже в режиме TASKS_EAGER.
+    """
+    if created and not raw:
+        pk = instance.pk
+        transaction.on_commit(lambda: tasks.notify_followers.delay(pk))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw, **kwargs):
+    """Дозаполняет ленту после подписки в фоне."""
+    if created and not raw:
+        tasks.backfill_timeline.delay(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def drop_suggestion(sender, instance, created, raw, **kwargs):
+    """Убирает рекомендацию автора, на которого уже подписались."""
+    if created and not raw:
+        Suggestion.objects.filter(
+            user_id=instance.user_id, author_id=instance.author_id
+        ).delete()
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    """Чистит ленту после отписки."""
+    timeline.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_following(sender, instance, **kwargs):
+    """Сбрасывает кэш подписок после подписки или отписки."""
+    follow_cache.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def invalidate_feeds(sender, **kwargs):
+    """Сбрасывает кэш лент после изменения их содержимого."""
+    bump_feed_generation()
+
+
+@receiver(post_save, sender=User)
+def invalidate_feeds_on_author_change(sender, update_fields, **kwargs):
+    """Сбрасывает кэш лент после изменения автора, но не после входа."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_feed_generation()
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_reply(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change_replies(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_reply(sender, instance, **kwargs):
+    # Удаление ветки удаляет и ответы, и каждый из них уменьшает
+    # счётчики оставшихся предков.
+    counters.change_replies(instance, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change(instance.user_id, 'following_count', 1)
+        counters.change(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change(instance.user_id, 'following_count', -1)
+    counters.change(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, raw, **kwargs):
+    """Готовит миниатюры картинки поста в фоне."""
+    if instance.image and not raw:
+        name = instance.image.name
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    # Только значение из базы; отложенное поле не загружается.
+    value = instance.__dict__.get('image')
+    instance._saved_image = value if isinstance(value, str) else None
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, **kwargs):
+    """Переносит ссылку поста со старого файла картинки на новый."""
+    if 'image' not in instance.__dict__:
+        return
+    old = None if created else instance._saved_image
+    new = images.image_name(instance.__dict__['image'])
+    if new != old:
+        images.acquire(new)
+        images.release(old)
+        instance._saved_image = new
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    images.release(images.image_name(instance.__dict__.get('image')))
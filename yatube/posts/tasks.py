@@ -0,0 +1,28 @@
+"""Фоновые задания постов, см. core.queue."""
+from core.queue import task
+
+from . import notifications, timeline
+from .models import Follow, Post
+
+
+@task(priority=10)
+def fan_out_post(post_id):
+    """Раскладывает пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task(priority=10)
+def backfill_timeline(user_id, author_id):
+    """Дозаполняет ленту после подписки, если она ещё действует."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        timeline.backfill(user_id, author_id)
+
+
+@task()
+def notify_followers(post_id):
+    """Ставит подписчикам события о новом посте для дайджестов."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        notifications.notify_followers(post)
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import AuthorStats, Comment, Follow, Post, TimelineEntry
+
+
+class BenchmarkCommandsTests(TestCase):
+    def generate(self):
+        call_command(
+            'generate_data', users=20, groups=3, posts=200, comments=300,
+            follows=4, stdout=StringIO(),
+        )
+
+    def test_generate_data_keeps_derived_data_consistent(self):
+        self.generate()
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            200,
+        )
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)), 300
+        )
+        self.assertGreater(
+            len(set(Post.objects.values_list('pub_date', flat=True))), 1
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_benchmark_report(self):
+        self.generate()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command(
+                'benchmark_views', requests=3, warmup=1, output=output,
+                stdout=StringIO(),
+            )
+            with open(output) as file:
+                report = json.load(file)
+        self.assertEqual(report['data']['posts'], 200)
+        self.assertEqual(
+            set(report['views']),
+            {'index', 'group_posts', 'profile', 'post_detail',
+             'follow_index', 'api_posts', 'api_comments'},
+        )
+        index = report['views']['index']
+        self.assertEqual(index['requests'], 3)
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries',
+                    'peak_memory_kb'):
+            self.assertIn(key, index)
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import AuthorStats, Comment, Post, User
+
+USER = 'User'
+TEXT = 'Тестовый текст'
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        cls.post = Post.objects.create(author=cls.user, text=TEXT)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def revalidate(self, url):
+        etag = self.guest_client.get(url)['ETag']
+        return self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_feed_is_not_rendered(self):
+        """Повторный запрос неизменной ленты не обращается к базе."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.user, text=TEXT)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_changes_with_comments(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(post=self.post, author=self.user, text=TEXT)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_profile_changes_with_followers(self):
+        url = reverse('posts:profile', args=[USER])
+        etag = self.guest_client.get(url)['ETag']
+        AuthorStats.objects.filter(user=self.user).update(followers_count=5)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            self.revalidate(url).status_code, HTTPStatus.NOT_MODIFIED
+        )
+
+    def test_new_version_invalidates_etag(self):
+        """После выкладки старый ETag не даёт 304."""
+        url = reverse('posts:index')
+        with override_settings(ETAG_VERSION='1'):
+            etag = self.guest_client.get(url)['ETag']
+        with override_settings(ETAG_VERSION='2'):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_authorized_pages_have_no_etag(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('ETag'))
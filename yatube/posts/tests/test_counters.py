@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+USER = 'User'
+AUTHOR = 'Author'
+TEXT = 'Тестовый текст'
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        cls.author = User.objects.create(username=AUTHOR)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются вместе с постами, подписками и комментариями."""
+        post = Post.objects.create(author=self.author, text=TEXT)
+        Follow.objects.create(user=self.user, author=self.author)
+        Comment.objects.create(post=post, author=self.user, text=TEXT)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_recount_counters_repairs_drift(self):
+        post = Post.objects.create(author=self.author, text=TEXT)
+        Comment.objects.create(post=post, author=self.user, text=TEXT)
+        AuthorStats.objects.update(posts_count=42)
+        AuthorStats.objects.filter(user=self.user).delete()
+        Post.objects.update(comments_count=0)
+        call_command('recount_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_profile_does_not_count_posts(self):
+        """Страница профиля не выполняет агрегирующих запросов."""
+        Post.objects.create(author=self.author, text=TEXT)
+        url = reverse('posts:profile', kwargs={'username': AUTHOR})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        self.assertContains(response, 'Всего постов: 1')
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
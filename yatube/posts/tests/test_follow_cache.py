@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.follow_cache import FollowingSet, following_ids
+from posts.models import Follow, User
+
+USER = 'User'
+AUTHOR = 'Author'
+
+
+class FollowCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        cls.author = User.objects.create(username=AUTHOR)
+        cls.others = [
+            User.objects.create(username=f'other{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_loaded_once_and_sorted(self):
+        for author in reversed(self.others):
+            Follow.objects.create(user=self.user, author=author)
+        following = FollowingSet(self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertIn(self.others[1].pk, following)
+            self.assertNotIn(self.author.pk, following)
+        self.assertEqual(
+            list(following), sorted(author.pk for author in self.others)
+        )
+        with self.assertNumQueries(0):
+            self.assertIn(self.others[0].pk, FollowingSet(self.user.pk))
+
+    def test_follow_and_unfollow_invalidate(self):
+        self.assertEqual(len(following_ids(self.user.pk)), 0)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[AUTHOR])
+        )
+        self.assertIn(self.author.pk, FollowingSet(self.user.pk))
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[AUTHOR])
+        )
+        self.assertNotIn(self.author.pk, FollowingSet(self.user.pk))
+
+    def test_profile_following(self):
+        """Профиль не падает у анонима и при нескольких подписках."""
+        url = reverse('posts:profile', args=[AUTHOR])
+        for author in self.others:
+            Follow.objects.create(user=self.user, author=author)
+        self.assertFalse(self.client.get(url).context['following'])
+        self.assertFalse(self.authorized_client.get(url).context['following'])
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(self.authorized_client.get(url).context['following'])
+        profile = self.authorized_client.get(
+            reverse('api:profile', args=[AUTHOR])
+        ).json()
+        self.assertTrue(profile['is_followed'])
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from posts import images
+from posts.models import ImageBlob, Post, User
+
+USER = 'User'
+TEXT = 'Тестовый текст'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-3] + b'\x0B\x00\x3B'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageDeduplicationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, 'posts'), True)
+
+    def create_post(self, filename, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text=TEXT,
+            image=SimpleUploadedFile(filename, content, 'image/gif'),
+        )
+
+    def refcount(self, name):
+        return ImageBlob.objects.get(name=name).refcount
+
+    def collect(self):
+        out = StringIO()
+        call_command('collect_images', grace_hours=0, stdout=out)
+        return out.getvalue()
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(
+            first.image.name, self.create_post('other.gif', OTHER_GIF)
+        )
+        self.assertEqual(self.refcount(first.image.name), 2)
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_unreferenced_blob_is_collected(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        name, path = first.image.name, first.image.path
+        first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertIn('Удалено файлов: 0', self.collect())
+        self.assertTrue(os.path.exists(path))
+
+        second.image = ''
+        second.save()
+        self.assertEqual(self.refcount(name), 0)
+        self.assertIn('Удалено файлов: 1', self.collect())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_reused_blob_is_not_collected(self):
+        """Файл, загруженный заново, переживает сборку до сохранения поста."""
+        post = self.create_post('first.gif')
+        name, path = post.image.name, post.image.path
+        post.image = ''
+        post.save()
+        stale = timezone.now() - timedelta(days=2)
+        ImageBlob.objects.filter(name=name).update(updated=stale)
+        self.assertEqual(images.collect(grace=timedelta(days=1)), [])
+        self.assertTrue(os.path.exists(path))
+        os.utime(path, (stale.timestamp(), stale.timestamp()))
+        self.assertEqual(images.collect(grace=timedelta(days=1)), [name])
+
+    def test_editing_image_moves_reference(self):
+        post = self.create_post('first.gif')
+        old_name = post.image.name
+        post = Post.objects.get(pk=post.pk)
+        post.image = SimpleUploadedFile('new.gif', OTHER_GIF, 'image/gif')
+        post.save()
+        self.assertEqual(self.refcount(old_name), 0)
+        self.assertEqual(self.refcount(post.image.name), 1)
@@ -0,0 +1,72 @@
+import re
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+USER = 'User'
+AUTHOR = 'Author'
+SLUG = 'test-slug'
+TEXT = 'Тестовый текст'
+POSTS_COUNT = 15
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+
+
+class FeedQueryPlanTests(TestCase):
+    """Запросы лент используют индексы и не сортируют во временном дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        author = User.objects.create(username=AUTHOR)
+        group = Group.objects.create(
+            title='Группа', slug=SLUG, description='Описание'
+        )
+        Follow.objects.create(user=cls.user, author=author)
+        for _ in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                author=author, group=group, text=TEXT
+            )
+        Comment.objects.create(post=cls.post, author=cls.user, text=TEXT)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def explain(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url, params)
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            for detail in self.explain(query):
+                with self.subTest(url=url, sql=query['sql']):
+                    self.assertNotIn('TEMP B-TREE', detail)
+                    self.assertIsNone(FULL_SCAN.match(detail), detail)
+        return response
+
+    def test_feed_queries_use_indexes(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': SLUG}),
+            reverse('posts:profile', kwargs={'username': AUTHOR}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            response = self.assert_indexed(url)
+            cursor = response.context['page_obj'].next_cursor
+            self.assert_indexed(url, {'cursor': cursor})
+
+    def test_post_detail_queries_use_indexes(self):
+        self.assert_indexed(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from posts import notifications, tasks
+from posts.models import Follow, Notification, Post, User
+
+TEXT = 'Тестовый текст'
+
+
+class DigestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.other = User.objects.create(username='other')
+        cls.readers = [
+            User.objects.create(
+                username=f'reader{number}', email=f'reader{number}@test.ru'
+            )
+            for number in range(3)
+        ]
+        cls.silent = User.objects.create(username='silent')
+        for reader in cls.readers + [cls.silent]:
+            Follow.objects.create(user=reader, author=cls.author)
+        Follow.objects.create(user=cls.readers[0], author=cls.other)
+
+    def test_new_post_queues_events_for_followers_with_email(self):
+        post = Post.objects.create(author=self.author, text=TEXT)
+        tasks.notify_followers(post.pk)
+        self.assertEqual(
+            set(post.notifications.values_list('user', flat=True)),
+            {reader.pk for reader in self.readers},
+        )
+
+    @override_settings(DIGEST_BATCH_SIZE=2)
+    def test_digests_are_coalesced_and_sent_over_one_connection(self):
+        first = Post.objects.create(author=self.author, text='Первый')
+        second = Post.objects.create(author=self.other, text='Второй')
+        for post in (first, second):
+            tasks.notify_followers(post.pk)
+        self.assertEqual(notifications.send_digests(), (0, 0))
+        connection = get_connection()
+        with mock.patch.object(
+            notifications, 'get_connection', return_value=connection
+        ) as factory:
+            emails, delivered = notifications.send_digests(
+                cutoff=timezone.now() + timedelta(seconds=1)
+            )
+        factory.assert_called_once_with()
+        self.assertEqual((emails, delivered), (3, 4))
+        digest = next(
+            message for message in mail.outbox
+            if message.to == [self.readers[0].email]
+        )
+        self.assertIn('Первый', digest.body)
+        self.assertIn('Второй', digest.body)
+        self.assertIn(f'/posts/{first.pk}/', digest.body)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_failed_send_keeps_only_undelivered_events(self):
+        tasks.notify_followers(
+            Post.objects.create(author=self.author, text=TEXT).pk
+        )
+        failing = self.readers[1].email
+        connection = get_connection()
+        send_messages = connection.send_messages
+
+        def send(messages):
+            if messages[0].to == [failing]:
+                raise ConnectionError('SMTP недоступен')
+            return send_messages(messages)
+
+        with mock.patch.object(
+            notifications, 'get_connection', return_value=connection
+        ), mock.patch.object(connection, 'send_messages', side_effect=send):
+            with self.assertLogs('posts.notifications', 'ERROR'):
+                self.assertEqual(notifications.send_digests(
+                    cutoff=timezone.now() + timedelta(seconds=1)
+                ), (2, 2))
+        self.assertEqual(
+            list(Notification.objects.values_list('user__email', flat=True)),
+            [failing],
+        )
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(notifications.send_digests(
+            cutoff=timezone.now() + timedelta(seconds=1)
+        ), (1, 1))
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(DIGEST_MAX_POSTS=1)
+    def test_digest_renders_only_latest_posts(self):
+        for text in ('Первый', 'Второй'):
+            tasks.notify_followers(
+                Post.objects.create(author=self.author, text=text).pk
+            )
+        self.assertEqual(notifications.send_digests(
+            cutoff=timezone.now() + timedelta(seconds=1)
+        ), (3, 6))
+        body = mail.outbox[0].body
+        self.assertIn('Второй', body)
+        self.assertNotIn('Первый', body)
+        self.assertIn('И ещё постов: 1', body)
+        self.assertFalse(Notification.objects.exists())
+
+
+class NotifyOnCommitTests(TransactionTestCase):
+    def test_notifications_are_queued_after_commit(self):
+        author = User.objects.create(username='author')
+        with mock.patch.object(tasks.notify_followers, 'delay') as delay:
+            with transaction.atomic():
+                post = Post.objects.create(author=author, text=TEXT)
+                delay.assert_not_called()
+        delay.assert_called_once_with(post.pk)
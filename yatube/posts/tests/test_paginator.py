@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.paginator import CursorPaginator
+from posts.models import Post, User
+
+USER = 'User'
+TEXT = 'Тестовый текст'
+PER_PAGE = 10
+POSTS_COUNT = 25
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create(username=USER)
+        for number in range(POSTS_COUNT):
+            Post.objects.create(author=user, text=f'{TEXT} {number}')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+
+    def tearDown(self):
+        cache.clear()
+
+    def walk_forward(self):
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(
+                self.paginator.get_page(cursor=pages[-1].next_cursor)
+            )
+        return pages
+
+    def test_cursor_pages_cover_feed_in_order(self):
+        """Курсоры обходят всю ленту без пропусков и повторов."""
+        pages = self.walk_forward()
+        posts = [post for page in pages for post in page]
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(
+            [post.pk for post in posts],
+            list(Post.objects.order_by('-pub_date', '-pk')
+                 .values_list('pk', flat=True))
+        )
+
+    def test_previous_cursor_returns_previous_page(self):
+        first, second, third = self.walk_forward()
+        previous = self.paginator.get_page(cursor=third.previous_cursor)
+        self.assertEqual(list(previous), list(second))
+        self.assertEqual(
+            list(self.paginator.get_page(cursor=second.previous_cursor)),
+            list(first)
+        )
+
+    def test_last_cursor_returns_oldest_posts(self):
+        first = self.paginator.get_page()
+        page = self.paginator.get_page(cursor=first.last_cursor)
+        self.assertFalse(page.has_next())
+        self.assertEqual(page[-1], Post.objects.order_by('pub_date')[0])
+
+    def test_page_past_the_end_shows_last_page(self):
+        page = self.paginator.get_page(number=99)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+        self.assertEqual(
+            self.guest_client.get(reverse('posts:index'), {'page': 99})
+            .status_code, 200
+        )
+        _, second, third = self.walk_forward()
+        Post.objects.filter(pk__in=[post.pk for post in third]).delete()
+        stale = self.paginator.get_page(cursor=second.next_cursor)
+        self.assertEqual(list(stale), list(second))
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        page = self.paginator.get_page(cursor='не-курсор')
+        self.assertEqual(list(page), list(self.paginator.get_page()))
+
+    def test_deep_page_does_not_count_or_offset(self):
+        """Глубокая страница — один запрос без COUNT и OFFSET."""
+        third = self.walk_forward()[-1]
+        url = reverse('posts:index')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                url, {'cursor': third.previous_cursor}
+            )
+        self.assertEqual(len(response.context['page_obj']), PER_PAGE)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import (Comment, Follow, Group, Post, User,
+                          root_comment_path)
+
+USER = 'User'
+AUTHOR = 'Author'
+SLUG = 'test-slug'
+TEXT = 'Тестовый текст'
+
+
+class FeedQueryCountTests(TestCase):
+    """Число запросов ленты не зависит от числа постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        cls.author = User.objects.create(
+            username=AUTHOR, first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug=SLUG, description='Описание'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': SLUG}),
+            reverse('posts:profile', kwargs={'username': AUTHOR}),
+            reverse('posts:follow_index'),
+        )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        return len(queries), len(response.context['page_obj'])
+
+    def add_posts(self, count):
+        for _ in range(count):
+            Post.objects.create(
+                author=self.author, group=self.group, text=TEXT
+            )
+
+    def test_feed_query_count_is_constant(self):
+        self.add_posts(1)
+        one_post = {url: self.count_queries(url) for url in self.urls}
+        self.add_posts(9)
+        for url in self.urls:
+            with self.subTest(url=url):
+                queries, shown = self.count_queries(url)
+                self.assertEqual(shown, 10)
+                self.assertEqual(queries, one_post[url][0])
+
+
+class PostDetailQueryCountTests(TestCase):
+    """Страница поста с тысячей комментариев — за постоянное число запросов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username=AUTHOR)
+        cls.user = User.objects.create(username=USER)
+        cls.group = Group.objects.create(
+            title='Группа', slug=SLUG, description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text=TEXT
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=cls.user if number % 2 else cls.author,
+                text=f'{TEXT} {number}',
+            )
+            for number in range(1000)
+        )
+        Comment.objects.filter(path='').update(path=root_comment_path())
+        # Ветка со свёрнутыми ответами: кнопка «Показать ответы» берёт
+        # число ответов из самого комментария.
+        root = Comment.objects.create(
+            post=cls.post, author=cls.user, text=TEXT
+        )
+        reply = Comment.objects.create(
+            post=cls.post, author=cls.author, text=TEXT, parent=root
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text=TEXT, parent=reply
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_anonymous(self):
+        # ETag, пост с автором, счётчиками и группой, страница комментариев.
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Показать ответы (1)')
+
+    def test_authorized(self):
+        client = Client()
+        client.force_login(self.user)
+        # Сессия и пользователь вместо ETag.
+        with self.assertNumQueries(4):
+            response = client.get(self.url)
+        self.assertContains(response, 'Показать ещё')
@@ -0,0 +1,86 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Post, User
+
+USER = 'User'
+SEARCH = reverse('posts:search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query, kind='posts', **params):
+        response = self.guest_client.get(
+            SEARCH, {'q': query, 'type': kind, **params}
+        )
+        return response, [item.pk for item in response.context['page_obj']]
+
+    def test_index_follows_changes(self):
+        post = Post.objects.create(author=self.user, text='Ежик в тумане')
+        self.assertEqual(self.found('ЕЖИК')[1], [post.pk])
+        Post.objects.filter(pk=post.pk).update(text='Слон в тумане')
+        self.assertEqual(self.found('ежик')[1], [])
+        self.assertEqual(self.found('СЛОН')[1], [post.pk])
+        post.delete()
+        self.assertEqual(self.found('туман')[1], [])
+
+    def test_results_are_ranked(self):
+        weak = Post.objects.create(
+            author=self.user, text='кот и много других слов в тексте'
+        )
+        strong = Post.objects.create(author=self.user, text='кот кот кот')
+        Post.objects.create(author=self.user, text='собака')
+        self.assertEqual(self.found('кот')[1], [strong.pk, weak.pk])
+
+    def test_keyset_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'пост номер {number}')
+            for number in range(15)
+        )
+        response, first = self.found('пост')
+        self.assertEqual(len(first), 10)
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D1%81%D1%82&amp;')
+        cursor = response.context['page_obj'].next_cursor
+        _, second = self.found('пост', cursor=cursor)
+        self.assertEqual(len(second), 5)
+        self.assertFalse(set(first) & set(second))
+
+    def test_comments_search(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Отличный комментарий'
+        )
+        self.assertEqual(
+            self.found('отличный', kind='comments')[1], [comment.pk]
+        )
+
+    def test_query_syntax_is_escaped(self):
+        Post.objects.create(author=self.user, text='текст')
+        for query in ('"', 'AND OR NOT', '*', 'текст"*) OR (', ''):
+            with self.subTest(query=query):
+                response, _ = self.found(query)
+                self.assertEqual(response.status_code, 200)
+
+    def test_admin_uses_full_text_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.guest_client.force_login(admin)
+        post = Post.objects.create(author=self.user, text='Редкое слово')
+        Post.objects.create(author=self.user, text='Другое')
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, {'q': 'редкое'})
+        self.assertEqual(
+            [obj.pk for obj in response.context['cl'].result_list],
+            [post.pk],
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
@@ -0,0 +1,56 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Follow, Suggestion, User
+from posts.suggestions import rebuild
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = ('user', 'friend', 'other_friend', 'fof', 'fan', 'similar')
+        cls.users = {
+            name: User.objects.create(username=name) for name in names
+        }
+
+    def follow(self, user, *authors):
+        for author in authors:
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author]
+            )
+
+    def suggested(self, user):
+        return [
+            suggestion.author.username for suggestion
+            in Suggestion.objects.filter(user=self.users[user])
+        ]
+
+    def test_friends_of_friends_and_co_follows(self):
+        self.follow('user', 'friend', 'other_friend')
+        self.follow('friend', 'fof', 'user')
+        self.follow('other_friend', 'fof')
+        # Подписчик friend читает и similar.
+        self.follow('fan', 'friend', 'similar')
+        _, suggestions = rebuild()
+        self.assertEqual(suggestions, Suggestion.objects.count())
+        suggested = self.suggested('user')
+        self.assertEqual(suggested[0], 'fof')
+        self.assertIn('similar', suggested)
+        self.assertNotIn('friend', suggested)
+        self.assertNotIn('user', suggested)
+
+    def test_pages_and_follow(self):
+        self.follow('user', 'friend')
+        self.follow('friend', 'fof')
+        rebuild()
+        client = Client()
+        client.force_login(self.users['user'])
+        url = reverse('posts:follow_index')
+        self.assertEqual(
+            client.get(url).context['suggestions'], [self.users['fof']]
+        )
+        client.get(reverse('posts:profile_follow', args=['fof']))
+        self.assertEqual(client.get(url).context['suggestions'], [])
+        Follow.objects.filter(user=self.users['user']).delete()
+        rebuild()
+        self.assertFalse(Suggestion.objects.filter(user=self.users['user']))
@@ -0,0 +1,86 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Post, User
+
+USER = 'User'
+TEXT = 'Тестовый текст'
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        cls.post = Post.objects.create(author=cls.user, text=TEXT)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text, parent=parent
+        )
+
+    def test_path_order(self):
+        """Новые ветки выше, ответы идут по порядку под родителем."""
+        first = self.comment('1')
+        reply = self.comment('1.1', first)
+        second = self.comment('2')
+        nested = self.comment('1.1.1', reply)
+        later = self.comment('1.2', first)
+        self.assertEqual(
+            list(self.post.comments.order_by('path')),
+            [second, first, reply, nested, later],
+        )
+        self.assertEqual(nested.depth, 2)
+        self.assertEqual(nested.ancestor_ids(), [first.pk, reply.pk])
+        self.assertEqual(list(first.subtree()), [reply, nested, later])
+
+    @override_settings(COMMENT_MAX_DEPTH=1)
+    def test_depth_limit(self):
+        root = self.comment('1')
+        reply = self.comment('1.1', root)
+        deeper = self.comment('1.1.1', reply)
+        self.assertEqual(deeper.parent, root)
+        self.assertEqual(deeper.depth, 1)
+
+    def test_replies_count(self):
+        root = self.comment('1')
+        reply = self.comment('1.1', root)
+        self.comment('1.1.1', reply)
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 2)
+        reply.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 0)
+
+    @override_settings(COMMENT_COLLAPSE_DEPTH=1)
+    def test_collapsed_replies_are_loaded_separately(self):
+        root = self.comment('1')
+        reply = self.comment('1.1', root)
+        nested = self.comment('1.1.1', reply)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(list(response.context['comments']), [root])
+        self.assertContains(response, 'Показать ответы (2)')
+        url = reverse('posts:comment_replies', args=[self.post.pk, root.pk])
+        with self.assertNumQueries(4):
+            response = self.authorized_client.get(url)
+        self.assertEqual(list(response.context['comments']), [reply, nested])
+
+    def test_reply_form(self):
+        root = self.comment('1')
+        other = Comment.objects.create(
+            post=Post.objects.create(author=self.user, text=TEXT),
+            author=self.user,
+            text='Чужой',
+        )
+        url = reverse('posts:add_comment', args=[self.post.pk])
+        self.authorized_client.post(url, {'text': 'Ответ', 'parent': root.pk})
+        self.authorized_client.post(url, {'text': 'Нет', 'parent': other.pk})
+        self.assertEqual(
+            list(root.subtree().values_list('text', flat=True)), ['Ответ']
+        )
+        self.assertFalse(Comment.objects.filter(text='Нет').exists())
@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts import thumbnails
+from posts.models import Post, User
+from sorl.thumbnail import default, get_thumbnail
+
+USER = 'User'
+TEXT = 'Тестовый текст'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        default.kvstore.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text=TEXT,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def tearDown(self):
+        default.kvstore.clear()
+
+    def warm(self, **options):
+        out = StringIO()
+        call_command(
+            'warm_thumbnails', workers=1, checkpoint=self.checkpoint,
+            stdout=out, stderr=StringIO(), **options
+        )
+        return out.getvalue()
+
+    @property
+    def checkpoint(self):
+        return os.path.join(TEMP_MEDIA_ROOT, 'checkpoint.json')
+
+    def test_missing_thumbnail_is_scheduled_not_rendered(self):
+        """Пока миниатюры нет, выводится исходная картинка."""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            image = get_thumbnail(self.post.image, GEOMETRY, **OPTIONS)
+        self.assertEqual(image.name, self.post.image.name)
+        schedule.assert_called_once_with(
+            self.post.image.name, ((GEOMETRY, OPTIONS),)
+        )
+
+    def test_pregenerated_thumbnail_is_served(self):
+        thumbnails.generate(self.post.image.name)
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            image = get_thumbnail(self.post.image, GEOMETRY, **OPTIONS)
+        self.assertNotEqual(image.name, self.post.image.name)
+        self.assertTrue(image.exists())
+        self.assertEqual((image.width, image.height), (960, 339))
+        schedule.assert_not_called()
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_scheduled_thumbnails_are_finished_on_shutdown(self):
+        """Пул доделывает поставленные задания при остановке."""
+        thumbnails.schedule(self.post.image.name)
+        thumbnails.shutdown()
+        image = get_thumbnail(self.post.image, GEOMETRY, **OPTIONS)
+        self.assertNotEqual(image.name, self.post.image.name)
+        self.assertTrue(image.exists())
+
+    def test_warm_thumbnails_command(self):
+        Post.objects.create(
+            author=self.user, text=TEXT, image='posts/missing.gif'
+        )
+        self.assertIn('Создано: 1, пропущено: 0, ошибок: 1', self.warm())
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            image = get_thumbnail(self.post.image, GEOMETRY, **OPTIONS)
+        self.assertNotEqual(image.name, self.post.image.name)
+        schedule.assert_not_called()
+        self.assertIn('Создано: 0, пропущено: 1, ошибок: 1', self.warm())
+
+    def test_warm_thumbnails_resumes_from_checkpoint(self):
+        with open(self.checkpoint, 'w') as file:
+            json.dump({'last_pk': self.post.pk}, file)
+        output = self.warm()
+        self.assertIn(f'Продолжение после поста {self.post.pk}', output)
+        self.assertIn('Обработано картинок: 0', output)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertIn('Создано: 1', self.warm(restart=True))
@@ -0,0 +1,89 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.timeline import timeline_posts
+
+USER = 'User'
+AUTHOR = 'Author'
+TEXT = 'Тестовый текст'
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        cls.author = User.objects.create(username=AUTHOR)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост попадает в ленту подписчика."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text=TEXT)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка дозаполняет ленту, отписка её чистит."""
+        Post.objects.create(author=self.author, text=TEXT)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.user.timeline.count(), 1)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertEqual(self.user.timeline.count(), 0)
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_is_bounded(self):
+        for _ in range(3):
+            Post.objects.create(author=self.author, text=TEXT)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.user.timeline.count(), 2)
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_fan_out_keeps_timeline_bounded(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=TEXT)
+            for _ in range(8)
+        ]
+        self.assertEqual(
+            list(self.user.timeline.values_list('post', flat=True)),
+            [post.pk for post in reversed(posts[-3:])],
+        )
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_read_is_bounded(self):
+        """Чтение ленты ограничено, даже если записи не обрезаны."""
+        posts = [
+            Post.objects.create(author=self.author, text=TEXT)
+            for _ in range(8)
+        ]
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user=self.user, post=post, pub_date=post.pub_date)
+            for post in posts
+        )
+        self.assertEqual(
+            list(timeline_posts(self.user)),
+            list(reversed(posts[-3:])),
+        )
+
+    @override_settings(TIMELINE_LENGTH=3, TIMELINE_FANOUT_LIMIT=0)
+    def test_merged_timeline_is_bounded(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        for _ in range(8):
+            Post.objects.create(author=self.author, text=TEXT)
+        self.assertEqual(timeline_posts(self.user).count(), 3)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        """Посты «звёзд» не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text=TEXT)
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
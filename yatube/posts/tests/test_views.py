@@ -3,10 +3,14 @@ import tempfile
 
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from posts.models import Comment, Follow, Group, Post, User
+from yatube.settings import comments_limit
 
 USER = 'User'
 TITLE = 'Test_title'
@@ -310,6 +314,48 @@ class CommentCreateTests(TestCase):
         self.assertEqual(comment_text, comment.text)
 
 
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USER)
+        cls.post = Post.objects.create(author=cls.user, text=TEXT)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'{COMMENT} {number}'
+            )
+            for number in range(comments_limit + 5)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_shows_first_comments(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), comments_limit)
+        self.assertEqual(comments[0], self.comments[-1])
+        self.assertTrue(comments.has_next)
+        self.assertContains(response, 'data-comments=')
+
+    def test_load_more_returns_next_comments(self):
+        first = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.pk])
+        ).context['comments']
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'cursor': first.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(
+            list(response.context['comments']), self.comments[4::-1]
+        )
+        self.assertNotContains(response, 'data-comments=')
+        self.assertNotContains(response, '<html')
+
+
 class CacheTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -324,15 +370,50 @@ class CacheTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.get(username=USER)
         self.guest_client = Client()
         self.post = Post.objects.get(text=TEXT)
 
     def test_cache_index_page(self):
+        """Главная страница кэшируется до изменения ленты."""
+        response = self.guest_client.get(INDEX)
+        self.assertContains(response, self.post)
+        Post.objects.filter(pk=self.post.pk).update(text='Обновлённый')
         response = self.guest_client.get(INDEX)
+        self.assertContains(response, self.post)
         Post.objects.all().delete()
+        response = self.guest_client.get(INDEX)
         self.assertNotContains(response, self.post)
 
+    def test_cache_index_page_varies_by_page(self):
+        """Страницы ленты кэшируются отдельно."""
+        for number in range(11):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+        self.guest_client.get(INDEX)
+        response = self.guest_client.get(INDEX + '?page=2')
+        self.assertContains(response, self.post)
+
+    def test_cached_index_page_skips_posts_query(self):
+        """Закэшированная страница ленты не читает посты из базы."""
+        self.guest_client.get(INDEX)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(INDEX)
+        self.assertContains(response, self.post)
+        self.assertFalse([
+            query for query in queries
+            if 'posts_post' in query['sql']
+        ])
+
+    def test_invalid_page_numbers_share_cache_entry(self):
+        key = self.guest_client.get(INDEX).context['page_obj'].cache_key
+        for query in ('?page=abc', '?page=01', '?page=99', '?cursor=xyz'):
+            with self.subTest(query=query):
+                response = self.guest_client.get(INDEX + query)
+                self.assertEqual(
+                    response.context['page_obj'].cache_key, key
+                )
+
 
 class TestFollow(TestCase):
     @classmethod
@@ -0,0 +1,166 @@
+"""Заранее подготовленные миниатюры картинок постов.
+
+Миниатюры размеров из `POST_THUMBNAILS` создаются в фоновом пуле потоков
+сразу после сохранения поста. Backend `DeferredThumbnailBackend` для
+sorl.thumbnail при выводе страницы только читает хранилище ключей:
+готовая миниатюра отдаётся сразу, а пока её нет, выводится исходная
+картинка и ставится задание на создание, так что страница никогда не
+обрабатывает изображения сама.
+
+Запрос не ждёт своих заданий. Пул доделывает поставленные задания при
+завершении процесса (`atexit`), поэтому перезапуск воркера не обрывает
+запись миниатюры на середине. При `THUMBNAIL_WORKERS = 0` миниатюры
+создаются сразу в вызывающем потоке.
+
+Хранилище ключей `CacheKVStore` живёт в отдельном кэше `THUMBNAIL_CACHE`
+на `core.cache_backends.SQLiteCache`: оно общее для всех воркеров узла,
+а фоновые потоки не обращаются к базе данных приложения.
+"""
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _prepare_options(backend, source, options):
+    # Те же значения по умолчанию, что у ThumbnailBackend.get_thumbnail,
+    # иначе имя миниатюры не совпадёт с созданной заранее.
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def source_file(name):
+    """Картинка поста в хранилище поля Post.image."""
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def _cached(backend, source, geometry, options):
+    prepared = _prepare_options(backend, source, options)
+    name = backend._get_thumbnail_filename(source, geometry, prepared)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def generate(name, sizes=None):
+    """Создаёт миниатюры картинки `name` синхронно."""
+    backend = ThumbnailBackend()
+    source = source_file(name)
+    for geometry, options in sizes or settings.POST_THUMBNAILS:
+        backend.get_thumbnail(source, geometry, **options)
+
+
+def warm(name, sizes=None):
+    """Создаёт недостающие миниатюры и возвращает их количество."""
+    backend = ThumbnailBackend()
+    source = source_file(name)
+    missing = [
+        (geometry, options)
+        for geometry, options in sizes or settings.POST_THUMBNAILS
+        if not _cached(backend, source, geometry, options)
+    ]
+    if not missing:
+        return 0
+    if not source.exists():
+        raise FileNotFoundError(name)
+    generate(name, missing)
+    return len(missing)
+
+
+def _run(key, name, sizes):
+    try:
+        if source_file(name).exists():
+            generate(name, sizes)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def schedule(name, sizes=None):
+    """Ставит создание миниатюр в фоновый пул, если оно ещё не запущено."""
+    global _executor
+    sizes = tuple(sizes or settings.POST_THUMBNAILS)
+    key = (name, repr(sizes))
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        if settings.THUMBNAIL_WORKERS and _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        executor = _executor if settings.THUMBNAIL_WORKERS else None
+    if executor is None:
+        _run(key, name, sizes)
+    else:
+        executor.submit(_run, key, name, sizes)
+
+
+@atexit.register
+def shutdown():
+    """Дожидается всех поставленных заданий и останавливает пул."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+class CacheKVStore(KVStoreBase):
+    """Хранилище ключей sorl.thumbnail в кэше без копии в базе данных."""
+
+    @property
+    def cache(self):
+        return caches[thumbnail_settings.THUMBNAIL_CACHE]
+
+    def _get_raw(self, key):
+        return self.cache.get(key)
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        return self.cache.keys(prefix)
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Отдаёт готовые миниатюры, а вместо недостающих — исходную картинку."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        cached = _cached(self, source, geometry_string, options)
+        if cached:
+            return cached
+        schedule(source.name, ((geometry_string, options),))
+        return source
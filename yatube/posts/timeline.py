@@ -0,0 +1,155 @@
+"""Материализованные ленты подписок (fan-out-on-write).
+
+Новый пост раскладывается по лентам подписчиков автора при сохранении,
+поэтому лента `follow_index` читается из готового ограниченного списка.
+Посты авторов с очень большим числом подписчиков («звёзд») в ленты не
+раскладываются и подмешиваются при чтении (fan-out-on-read).
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_celebrity(author_id):
+    """Автор, чьи посты не раскладываются по лентам подписчиков."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def celebrity_ids(user_id):
+    """Авторы-«звёзды», на которых подписан пользователь."""
+    return list(
+        AuthorStats.objects.filter(
+            user__following__user_id=user_id,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).iterator()
+    while True:
+        batch = list(islice(followers, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id, post=post, pub_date=post.pub_date
+                )
+                for user_id in batch
+            ),
+            ignore_conflicts=True,
+        )
+        for user_id in over_limit(batch):
+            trim(user_id)
+
+
+def over_limit(user_ids):
+    """Пользователи, чьи ленты длиннее `TIMELINE_LENGTH`."""
+    return list(
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .order_by().values('user_id')
+        .annotate(entries=Count('pk'))
+        .filter(entries__gt=settings.TIMELINE_LENGTH)
+        .values_list('user_id', flat=True)
+    )
+
+
+def trim(user_id):
+    """Оставляет в ленте только `TIMELINE_LENGTH` последних записей."""
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    # Первая лишняя запись ищется по индексу ленты, удаляется она и всё,
+    # что старше.
+    cutoff = entries.order_by('-pub_date', '-post_id').values(
+        'pub_date', 'post_id'
+    )[settings.TIMELINE_LENGTH:settings.TIMELINE_LENGTH + 1].first()
+    if cutoff is None:
+        return
+    entries.filter(
+        Q(pub_date__lt=cutoff['pub_date'])
+        | Q(pub_date=cutoff['pub_date'], post_id__lte=cutoff['post_id'])
+    ).delete()
+
+
+def backfill(user_id, author_id):
+    """Дозаполняет ленту постами автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_LENGTH]
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    )
+    trim(user_id)
+
+
+def rebuild(user_id):
+    """Заново собирает ленту пользователя по его подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author__following__user_id=user_id
+    ).exclude(
+        author_id__in=celebrity_ids(user_id)
+    ).order_by('-pub_date', '-pk').values_list('pk', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts[:settings.TIMELINE_LENGTH]
+    )
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+
+
+def timeline_posts(user):
+    """Посты ленты подписок пользователя.
+
+    Без «звёзд» лента читается по индексу материализованных записей и
+    упорядочена по их полям. Посты «звёзд» подмешиваются к ленте; обе
+    части ограничены `TIMELINE_LENGTH` последними постами.
+    """
+    entries = TimelineEntry.objects.filter(user=user).order_by(
+        '-pub_date', '-post_id'
+    ).values('post_id')[:settings.TIMELINE_LENGTH]
+    celebrities = celebrity_ids(user.pk)
+    if not celebrities:
+        return Post.objects.filter(
+            timeline_entries__user=user, pk__in=entries
+        ).annotate(
+            timeline_date=F('timeline_entries__pub_date'),
+            timeline_post=F('timeline_entries__post'),
+        ).order_by('-timeline_date', '-timeline_post')
+    celebrity_posts = Post.objects.filter(
+        author_id__in=celebrities
+    ).order_by('-pub_date', '-pk').values('pk')[:settings.TIMELINE_LENGTH]
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(pk__in=celebrity_posts)
+    )
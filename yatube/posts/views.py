@@ -1,21 +1,34 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.http import urlencode
 
-from yatube.settings import page_limit
+from core.paginator import paginate
+from yatube.settings import comments_limit, page_limit
 
+from .conditional import (anonymous_condition, feed_etag, post_etag,
+                          profile_etag)
+from .feed_cache import feed_key
+from .follow_cache import following as following_set
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Group, Post
+from .search import search_comments, search_posts
+from .suggestions import suggested_authors
+from .timeline import timeline_posts
 
 User = get_user_model()
 
 
+@anonymous_condition(feed_etag)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, page_limit)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.feed()
+    page_obj = paginate(
+        request, posts, page_limit,
+        cache_key=feed_key('index'), timeout=settings.FEED_CACHE_TIMEOUT,
+    )
     title = 'Последние обновления на сайте'
     files = request.FILES or None
     context = {
@@ -23,16 +36,34 @@ def index(request):
         'posts': posts,
         'title': title,
         'files': files,
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/index.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    kind = 'comments' if request.GET.get('type') == 'comments' else 'posts'
+    if kind == 'comments':
+        results = search_comments(query)
+    else:
+        results = search_posts(query)
+    page_obj = paginate(request, results, page_limit)
+    page_params = urlencode({'q': query, 'type': kind})
+    context = {
+        'query': query,
+        'kind': kind,
+        'page_obj': page_obj,
+        'page_params': f'{page_params}&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@anonymous_condition(feed_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, page_limit)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.feed()
+    page_obj = paginate(request, posts, page_limit)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -41,46 +72,111 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@anonymous_condition(profile_etag)
 def profile(request, username):
-    author = User.objects.get(username=username)
-    posts = Post.objects.filter(author=author)
-    paginator = Paginator(posts, page_limit)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = False
-    if Follow.objects.all().exists():
-        if Follow.objects.get(user=request.user).user == request.user:
-            following = True
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    posts = author.posts.feed()
+    page_obj = paginate(request, posts, page_limit)
+    following = author.pk in following_set(request.user)
     context = {
         'author': author,
         'page_obj': page_obj,
         'posts': posts,
         'following': following,
+        'suggestions': suggested_authors(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@anonymous_condition(post_etag)
 def post_detail(request, post_id):
-    post = Post.objects.get(pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id
+    )
     group = post.group
     author = post.author
-    posts = Post.objects.filter(author=author)
     title = f'Пост {post.text[:30]}'
+    reply_to = request.GET.get('reply_to', '')
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
     context = {
         'author': author,
         'group': group,
         'post': post,
-        'posts': posts,
         'title': title,
         'form': form,
-        'comments': comments,
+        'reply_to': reply_to if reply_to.isdigit() else None,
+        **comments_context(request, post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(request, post_id, root=None):
+    """Комментарии поста в порядке веток.
+
+    Без root — верхние уровни веток до COMMENT_COLLAPSE_DEPTH, с root —
+    все ответы на этот комментарий.
+    """
+    if root is None:
+        comments = Comment.objects.filter(
+            post_id=post_id, depth__lt=settings.COMMENT_COLLAPSE_DEPTH
+        )
+    else:
+        comments = root.subtree()
+    return paginate(
+        request,
+        comments.select_related('author'),
+        comments_limit,
+        ordering=('path',),
+    )
+
+
+def comments_context(request, post_id, root=None):
+    if root is None:
+        more_url = reverse('posts:post_comments', args=[post_id])
+        page_url = reverse('posts:post_detail', args=[post_id])
+        collapse_depth = settings.COMMENT_COLLAPSE_DEPTH
+    else:
+        more_url = page_url = reverse(
+            'posts:comment_replies', args=[post_id, root.pk]
+        )
+        collapse_depth = None
+    return {
+        'post_id': post_id,
+        'comments': comments_page(request, post_id, root),
+        'more_url': more_url,
+        'page_url': page_url,
+        'collapse_depth': collapse_depth,
+    }
+
+
+def post_comments(request, post_id):
+    """Очередная порция комментариев поста для кнопки «Показать ещё»."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return render(
+        request,
+        'posts/includes/comments.html',
+        comments_context(request, post_id),
+    )
+
+
+def comment_replies(request, post_id, comment_id):
+    """Свёрнутые ответы на комментарий."""
+    root = get_object_or_404(
+        Comment.objects.only('post', 'path'), pk=comment_id, post_id=post_id
+    )
+    return render(
+        request,
+        'posts/includes/comments.html',
+        comments_context(request, post_id, root),
+    )
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -118,31 +214,42 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = Post.objects.get(id=post_id)
     form = CommentForm(request.POST or None)
+    parent_id = request.POST.get('parent', '')
+    parent = None
+    if parent_id:
+        # Отвечать можно только на комментарии этого же поста.
+        parent = post.comments.filter(
+            pk=parent_id if parent_id.isdigit() else None
+        ).first()
+        if parent is None:
+            return redirect('posts:post_detail', post_id=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = parent
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, page_limit)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = timeline_posts(request.user).feed()
+    page_obj = paginate(request, posts, page_limit)
     context = {
         'page_obj': page_obj,
         'posts': posts,
+        'suggestions': suggested_authors(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = User.objects.get(username=username)
     if author != request.user:
@@ -154,6 +261,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = User.objects.get(username=username)
     Follow.objects.filter(
@@ -0,0 +1,23 @@
+// Кнопка «Показать ещё» подгружает следующую порцию комментариев
+// вместо перехода на страницу; без JavaScript работает как обычная ссылка.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-comments]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  link.classList.add('disabled');
+  fetch(link.dataset.comments)
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.status);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      link.outerHTML = html;
+    })
+    .catch(function () {
+      window.location = link.href;
+    });
+});
@@ -19,6 +19,7 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
@@ -33,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -47,13 +50,42 @@ INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+# Метрики (core.metrics). Для нескольких воркеров задайте общий каталог
+# METRICS_DIR; /metrics/ доступен с INTERNAL_IPS или с заголовком
+# "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Журнал медленных запросов (core.slow_queries): порог в миллисекундах,
+# без него журнал выключен. Сводка — manage.py slow_queries.
+SLOW_QUERY_THRESHOLD = (
+    float(os.environ['SLOW_QUERY_THRESHOLD'])
+    if os.environ.get('SLOW_QUERY_THRESHOLD') else None
+)
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
+# Журнал ротирует внешний logrotate; столько его копий читает сводка.
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Фоновые задания core.queue выполняет команда run_tasks. С TASKS_EAGER=1
+# они выполняются сразу при постановке, без воркера.
+TASKS_EAGER = os.environ.get('TASKS_EAGER') == '1'
+TASK_THREADS = 4
+TASK_POLL_INTERVAL = 1
+TASK_MAX_ATTEMPTS = 5
+# Задержка повтора удваивается с каждой попыткой.
+TASK_RETRY_DELAY = 10
+TASK_RETRY_MAX_DELAY = 60 * 60
+# Задание, которое выполняется дольше, считается брошенным воркером.
+TASK_TIMEOUT = 10 * 60
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -106,24 +138,89 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+# collectstatic добавляет к именам хеш содержимого и сжатые копии .gz,
+# в production их отдаёт core.staticfiles.StaticFilesApplication (wsgi.py).
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# Адрес сайта для ссылок в письмах.
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+
+# Дайджесты новых постов: письмо уходит, когда самому старому событию
+# пользователя исполнится DIGEST_WINDOW секунд; письма отправляются
+# пачками по DIGEST_BATCH_SIZE пользователей.
+DIGEST_WINDOW = 60 * 60
+DIGEST_BATCH_SIZE = 500
+DIGEST_MAX_POSTS = 20
 
 page_limit = 10
+# Комментариев на странице поста и в каждой догружаемой порции.
+comments_limit = 20
+# Наибольшая вложенность ответов; более глубокие ответы становятся
+# соседями родителя.
+COMMENT_MAX_DEPTH = 5
+# Начиная с этого уровня ответы на странице поста свёрнуты.
+COMMENT_COLLAPSE_DEPTH = 2
+# Наибольший размер страницы JSON API (?limit=).
+API_MAX_LIMIT = 100
+
+# Длина материализованной ленты подписок.
+TIMELINE_LENGTH = 1000
+# Посты авторов с большим числом подписчиков подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+
+# Рекомендации «на кого подписаться»: сколько хранить на пользователя,
+# сколько похожих авторов помнить для каждого автора и по скольким его
+# подписчикам оценивать похожесть.
+SUGGESTIONS_COUNT = 10
+SUGGESTIONS_SIMILAR = 20
+SUGGESTIONS_SAMPLE = 200
 
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры создаются в фоне после сохранения поста, страницы выводят
+# только готовые (см. posts.thumbnails).
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.CacheKVStore'
+THUMBNAIL_CACHE = 'thumbnails'
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+# 0 — создавать миниатюры сразу, без фонового пула.
+THUMBNAIL_WORKERS = 2
+
+# Общий для всех воркеров узла кэш в файле SQLite.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': '127.0.0.1:8000',
-    }
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'thumbnails': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'thumbnails.sqlite3'),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+        },
+    },
 }
 
+# Кэш лент сбрасывается сигналами, поэтому может жить долго.
+FEED_CACHE_TIMEOUT = 60 * 60
+# Подписки пользователя тоже сбрасываются сигналами.
+FOLLOW_CACHE_TIMEOUT = 24 * 60 * 60
+# Версия выкладки в ETag страниц, например хеш коммита. Без неё ETag
+# зависит от хеша исходников, шаблонов и манифеста статики.
+ETAG_VERSION = os.environ.get('ETAG_VERSION', '')
+
 EMPTY_VALUE_DISPLAY = '-пусто-'
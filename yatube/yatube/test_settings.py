@@ -0,0 +1,26 @@
+"""Настройки для тестов.
+
+Кэши, которые тесты очищают, живут во временном каталоге, а не в файлах
+узла рядом с проектом. Фоновые задания выполняются сразу при постановке.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+CACHE_DIR = tempfile.mkdtemp(prefix='yatube-tests-')
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+
+CACHES = {
+    alias: {**options, 'LOCATION': os.path.join(CACHE_DIR, f'{alias}.sqlite3')}
+    for alias, options in CACHES.items()
+}
+
+# Миниатюры создаются сразу: фоновые потоки не переживают тест и его
+# временный MEDIA_ROOT.
+THUMBNAIL_WORKERS = 0
+
+TASKS_EAGER = True